@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules import each other by name from Python_Code
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
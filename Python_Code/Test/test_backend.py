@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from backend import AsyncBackend, BackendError, RemoteEstimator, SimulatorServer
+from qubit import Qubit
+from sampling import ShotSampler
+from system import System
+
+QUBIT = Qubit(2, 1, 0.3, 0.1)
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 30))
+
+
+class BadServer:
+    """Answers each request line with the next of `replies` (a function of the request, or None for silence)."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+
+    async def serve(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                reply = self.replies.pop(0)(json.loads(line))
+                if reply is not None:
+                    writer.write(reply + b"\n")
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+@pytest.mark.parametrize("reply, error", [
+    (lambda r: b"not json", BackendError),
+    (lambda r: json.dumps({"id": r["id"] + 1, "successes": [1]}).encode(), BackendError),
+    (lambda r: json.dumps({"id": r["id"], "successes": [1, 2]}).encode(), BackendError),
+    (lambda r: json.dumps({"id": r["id"], "successes": "x"}).encode(), BackendError),
+    (lambda r: json.dumps({"id": r["id"], "error": "busy"}).encode(), BackendError),
+    (lambda r: None, asyncio.TimeoutError),
+])
+def test_malformed_replies_fail_the_batch_and_keep_the_pool(reply, error):
+    good = lambda r: json.dumps({"id": r["id"], "successes": [7]}).encode()
+
+    async def main():
+        server = await asyncio.start_server(BadServer([reply, good]).serve, "127.0.0.1", 0)
+        async with server:
+            async with AsyncBackend(*server.sockets[0].getsockname()[:2], connections=1, timeout=0.5) as b:
+                with pytest.raises(error):
+                    await b.measure("q", (0, 0, -1), "z", 0, 1.0, 10)
+                # The connection was replaced: the next request goes through
+                assert await b.measure("q", (0, 0, -1), "z", 0, 1.0, 10) == 7
+                assert b.pool.qsize() == 1
+
+    run(main())
+
+
+def test_identical_requests_are_merged_and_split_exactly():
+    async def main():
+        async with SimulatorServer({"q": QUBIT}, ShotSampler(0)) as server:
+            async with AsyncBackend(*server.address, linger=0.05, rng=np.random.default_rng(0)) as b:
+                counts = await asyncio.gather(*(b.measure("q", (0, 0, -1), "z", 0, 1.0, 1000) for _ in range(8)))
+            assert server.jobs == 1 and b.batches == 1
+        return counts
+
+    counts = run(main())
+    assert all(0 <= k <= 1000 for k in counts)
+    assert abs(sum(counts) / 8000 - np.exp(-QUBIT.gamma1)) < 0.03
+
+
+def test_close_fails_waiting_requests():
+    async def main():
+        b = AsyncBackend("127.0.0.1", 9, connections=1)  # never started: nothing is sent
+        task = asyncio.create_task(b.measure("q", (0, 0, -1), "z", 0, 1.0, 10))
+        await asyncio.sleep(0)
+        await b.close()
+        with pytest.raises(BackendError):
+            await task
+
+    run(main())
+
+
+def test_remote_estimator_matches_the_protocols():
+    async def main():
+        async with SimulatorServer({"q": QUBIT}, ShotSampler(1)) as server:
+            async with AsyncBackend(*server.address) as b:
+                z = RemoteEstimator(System(0, 0, -1), b, "q", ShotSampler(2))
+                x = RemoteEstimator(System(0, 1, 0), b, "q", ShotSampler(3))
+                values = await asyncio.gather(z.estimate_gamma1(QUBIT, 100000), z.estimate_kappa(QUBIT, 100000),
+                                              x.estimate_gamma2(QUBIT, 100000), x.estimate_omega(QUBIT, 100000))
+                with pytest.raises(ValueError):
+                    await x.estimate_omega(QUBIT, 1000, method="smc")
+        return values
+
+    gamma1, kappa, gamma2, omega = run(main())
+    assert gamma1 == pytest.approx(0.3, abs=0.02) and gamma2 == pytest.approx(0.1, abs=0.03)
+    assert kappa == pytest.approx(1, abs=0.02) and omega == pytest.approx(2, abs=0.05)
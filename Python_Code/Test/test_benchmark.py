@@ -0,0 +1,35 @@
+import benchmark
+from qubit import Qubit
+
+
+def rows(**kwargs):
+    return benchmark.run_benchmark(samples=4, shots=(1000, 10000), protocols=("gamma1", "kappa"),
+                                   version="test", **kwargs)
+
+
+def test_rows_do_not_depend_on_earlier_rows():
+    # The n=10000 row costs the same whether or not the n=1000 row warmed the cache
+    alone = benchmark.run_benchmark(samples=4, shots=(10000,), protocols=("gamma1",), version="test")[0]
+    after = rows()[1]
+    assert after["propagator_calls"] == alone["propagator_calls"] > 0
+    assert after["cache_misses"] == alone["cache_misses"] > 0
+
+
+def test_rows_are_reproducible():
+    drop = lambda rs: [{k: v for k, v in r.items() if k not in ("wall_time", "time_per_qubit")} for r in rs]
+    assert drop(rows(seed=3)) == drop(rows(seed=3))
+
+
+def test_shots_count_the_true_system_only():
+    qubits = [Qubit(2, 1, 0.3, 0.1)] * 3
+    row = benchmark.run_protocol("gamma1", qubits, 1000, seed=0)
+    assert row["shots"] == row["draws"] == 3000
+    row = benchmark.run_protocol("kappa", qubits, 1000, seed=0)
+    assert 3000 < row["shots"] < row["draws"]
+
+
+def test_cheapest_n():
+    table = [{"protocol": "gamma1", "n": 1000, "rmse": 0.05}, {"protocol": "gamma1", "n": 10000, "rmse": 0.01},
+             {"protocol": "gamma1", "n": 100000, "rmse": 0.003}]
+    assert benchmark.cheapest_n(table, "gamma1", 0.02) == 10000
+    assert benchmark.cheapest_n(table, "gamma1", 0.001) is None
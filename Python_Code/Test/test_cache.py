@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import cache
+import propagator
+from cache import LRUCache
+from measurement import excited_probability
+
+PARAMS = [2.0, 0.0, 1.0, 0.3, 0.1]
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    cache.clear()
+    yield
+    cache.configure(enable=True)
+    cache.clear()
+
+
+def test_keys_share_round_off_but_not_real_differences():
+    lru = LRUCache(quantum=1e-12)
+    assert lru.key("P", 0.1 + 0.2) == lru.key("P", 0.3)
+    assert lru.key("P", 0.3) != lru.key("P", 0.3 + 1e-9)
+    assert lru.key("P", 0.3) != lru.key("Q", 0.3)
+
+
+def test_evicts_least_recently_used_within_the_byte_cap():
+    lru = LRUCache(max_bytes=3 * LRUCache.ENTRY_OVERHEAD)
+    for name in "abc":
+        lru.put(name, name)
+    lru.get("a")      # a is now the most recently used
+    lru.put("d", "d")  # evicts b
+    assert lru.get("b") is None
+    assert [lru.get(k) for k in "acd"] == ["a", "c", "d"]
+    assert lru.evictions == 1 and lru.bytes <= lru.max_bytes
+
+
+def test_oversized_values_are_not_cached():
+    lru = LRUCache(max_bytes=1000)
+    lru.put("big", "x", nbytes=2000)
+    assert lru.get("big") is None and lru.bytes == 0
+
+
+def test_cached_propagator_is_exact_and_reused():
+    P = cache.cached_propagator(PARAMS, 0.7)
+    assert np.array_equal(P, propagator.propagator(PARAMS, 0.7))
+    before = propagator.stats()["calls"]
+    cache.cached_propagator(PARAMS, 0.7)
+    assert propagator.stats()["calls"] == before
+    assert cache.stats()["propagators"]["hits"] == 1
+
+
+def test_probability_is_keyed_on_the_initial_state():
+    p1 = cache.probability(PARAMS, [0, 0, -1], 0.7, excited_probability)
+    p2 = cache.probability(PARAMS, [0, 1, 0], 0.7, excited_probability)
+    assert p1 != p2
+    assert p2 == pytest.approx(float(excited_probability(propagator.evolve(PARAMS, [0, 1, 0], 0.7))))
+
+
+def test_disabled_cache_stores_nothing():
+    cache.configure(enable=False)
+    cache.cached_propagator(PARAMS, 0.7)
+    cache.probability(PARAMS, [0, 0, -1], 0.7, excited_probability)
+    assert all(s["entries"] == 0 for s in cache.stats().values())
@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+import pytest
+
+import cli
+import dataset
+import joint
+from qubit import Qubit
+from sampling import ShotSampler
+
+
+def test_random_campaign_to_json(tmp_path, capsys):
+    out = tmp_path / "results.json"
+    assert cli.main(["--random", "2", "--shots", "5000", "--seed", "1", "--workers", "1",
+                     "--parameters", "gamma1", "omega", "--output", str(out)]) == 0
+    rows = json.loads(out.read_text())
+    assert [r["index"] for r in rows] == [0, 1]
+    assert all("gamma1" in r and "omega" in r and "kappa" not in r for r in rows)
+
+
+def test_store_resumes_a_campaign(tmp_path, capsys):
+    args = ["--random", "2", "--shots", "2000", "--seed", "4", "--workers", "1", "--parameters", "gamma1",
+            "--store", str(tmp_path / "store"), "--output", str(tmp_path / "a.json")]
+    cli.main(args)
+    cli.main(args[:-1] + [str(tmp_path / "b.json")])
+    assert "2 of 2 results reused" in capsys.readouterr().err
+    a, b = (json.loads((tmp_path / name).read_text()) for name in ("a.json", "b.json"))
+    assert [r["gamma1"] for r in a] == [r["gamma1"] for r in b]
+
+
+def test_dataset_mode_fits_and_rejects_simulation_options(tmp_path, capsys):
+    path = str(tmp_path / "run")
+    dataset.record(path, Qubit(2, 1, 0.3, 0.1), joint.schedule(np.linspace(0.25, 4, 8)), 2000,
+                   sampler=ShotSampler(0))
+    out = tmp_path / "fit.csv"
+    cli.main(["--dataset", path, "--output", str(out)])
+    assert "gamma2_stderr" in out.read_text().splitlines()[0]
+    for extra in (["--shots", "10"], ["--method", "smc"], ["--store", str(tmp_path)]):
+        with pytest.raises(SystemExit):
+            cli.main(["--dataset", path] + extra)
+        assert "not allowed with --dataset" in capsys.readouterr().err
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import propagator
+from control import Control
+from qubit import Qubit
+from system import System
+
+QUBIT = Qubit(2, 1, 0.3, 0.1)
+SEGMENTS = [(3.0, 0.4), (0.0, 0.3), (-1.5, 0.5)]
+
+
+def test_until_covers_exactly_t():
+    control = Control.sequence(SEGMENTS)
+    assert control.until(0.5) == [(3.0, 0.4), (0.0, pytest.approx(0.1))]
+    assert control.until(2.0)[-1] == (0.0, pytest.approx(0.8))
+    assert sum(d for _, d in control.until(2.0)) == pytest.approx(2.0)
+    assert control.duration() == pytest.approx(1.2)
+
+
+def test_sequence_equals_composed_segments():
+    params = [2.0, 1.0, 0.3, 0.1]
+    P = np.eye(4)
+    for u, d in SEGMENTS + [(0.0, 0.3)]:  # then the undriven tail
+        P = propagator.propagator([params[0], u, *params[1:]], d) @ P
+    assert np.allclose(propagator.sequence(params, *zip(*SEGMENTS), 1.5), P)
+
+
+def test_evolve_and_trajectory_agree_with_chained_constant_drives():
+    chained = System(0, 0, -1)
+    for u, d in SEGMENTS:
+        chained.evolve(QUBIT, Control(u), d)
+    sequenced = System(0, 0, -1)
+    sequenced.evolve(QUBIT, Control.sequence(SEGMENTS), 1.2)
+    assert np.allclose(sequenced.get_coordinates(), chained.get_coordinates())
+    path = System(0, 0, -1).trajectory(QUBIT, Control.sequence(SEGMENTS), [0.6, 1.2])
+    assert np.allclose(path[-1], chained.get_coordinates())
+
+
+def test_invalid_sequences_are_rejected():
+    with pytest.raises(ValueError):
+        Control.sequence([])
+    with pytest.raises(ValueError):
+        Control.sequence([(1.0, -0.1)])
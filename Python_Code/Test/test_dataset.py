@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+import dataset
+import joint
+from qubit import Qubit
+from sampling import ShotSampler
+
+QUBIT = Qubit(2, 1, 0.3, 0.1)
+SETTINGS = joint.schedule(np.linspace(0.25, 4, 6))
+
+
+def test_round_trip_of_the_columns(tmp_path):
+    path = str(tmp_path / "run")
+    data = dataset.record(path, QUBIT, SETTINGS, shots=100, sampler=ShotSampler(0))
+    reopened = dataset.Dataset(path)
+    assert len(reopened) == len(SETTINGS)
+    assert reopened.qubit.get_param() == QUBIT.get_param()
+    settings = reopened.settings()
+    assert np.array_equal(settings.t, SETTINGS.t) and list(settings.basis) == list(SETTINGS.basis)
+    assert np.array_equal(reopened.column("shots"), np.full(len(SETTINGS), 100))
+    assert np.array_equal(reopened.column("successes"), data.column("successes"))
+
+
+def test_repeated_settings_are_merged(tmp_path):
+    path = str(tmp_path / "run")
+    data = dataset.record(path, QUBIT, SETTINGS, shots=100, repeats=3, sampler=ShotSampler(1))
+    settings, shots, successes = data.arrays()
+    assert len(data) == 3 * len(SETTINGS) and len(settings) == len(SETTINGS)
+    assert np.all(shots == 300)
+    assert successes.sum() == data.column("successes").sum()
+
+
+def test_interrupted_append_is_invisible(tmp_path):
+    path = str(tmp_path / "run")
+    data = dataset.record(path, QUBIT, SETTINGS, shots=100, sampler=ShotSampler(2))
+    # Bytes of a chunk whose meta.json was never committed
+    with open(os.path.join(path, "t.bin"), "ab") as f:
+        f.write(np.ones(5).tobytes())
+    assert len(dataset.Dataset(path)) == len(SETTINGS)
+    data.append(SETTINGS[:2], 10, [1, 2])
+    assert np.array_equal(dataset.Dataset(path).column("t")[-2:], SETTINGS.t[:2])
+
+
+def test_rejects_unknown_versions_and_empty_fits(tmp_path):
+    data = dataset.Dataset.create(str(tmp_path / "empty"))
+    assert data.qubit is None
+    with pytest.raises(ValueError, match="empty"):
+        data.arrays()
+    data.meta["version"] = 99
+    dataset._write_meta(data.path, data.meta)
+    with pytest.raises(ValueError, match="version"):
+        dataset.Dataset(data.path)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import design
+import joint
+
+
+def test_information_sums_to_the_dataset_fisher():
+    settings = joint.schedule(np.linspace(0.3, 3, 5))
+    theta = np.array([2.0, 1.0, 0.3, 0.1])
+    shots = np.full(len(settings), 100.0)
+    F = design.information(settings, theta)[0]
+    assert np.allclose(np.einsum("n,nij->ij", shots, F), joint.fisher(settings, shots, theta))
+
+
+def test_design_beats_the_uniform_schedule():
+    rng = np.random.default_rng(0)
+    candidates = design.grid(np.linspace(0.1, 5, 20))
+    chosen = design.design(candidates, iterations=200, rng=np.random.default_rng(1))
+    assert np.isclose(chosen.weights.sum(), 1)
+    F = design.information(candidates, design.prior_sample(n=32, rng=rng))
+    uniform = design.expected_variance(F, np.full(len(candidates), 1 / len(candidates)))
+    # The chosen settings are a subset of the candidates; put their weights back on the grid
+    weights = np.zeros(len(candidates))
+    for t, u, b, w in zip(chosen.t, chosen.u, chosen.basis, chosen.weights):
+        weights[(candidates.t == t) & (candidates.u == u) & (candidates.basis == b)] += w
+    assert design.expected_variance(F, weights) < uniform
+
+
+def test_coverage_share_reaches_every_candidate():
+    candidates = design.grid(np.linspace(0.1, 5, 10))
+    chosen = design.design(candidates, iterations=50, coverage=0.2, rng=np.random.default_rng(2))
+    assert len(chosen) == len(candidates)
+    assert chosen.weights.min() >= 0.2 / len(candidates) - 1e-12
+
+
+def test_grid_repeats_the_drive_at_each_amplitude():
+    settings = design.grid(np.linspace(0.1, 1, 4), u=[500, 1000])
+    assert len(settings) == 16
+    assert sorted(set(settings.u)) == [0, 500, 1000]
+    assert np.allclose(settings.t[settings.u == 500] * 500, np.linspace(0.1, 1, 4))
+
+
+def test_best_time_for_gamma1_is_near_its_optimum():
+    # p = e^(-gamma1 t) gives F = t^2 / (e^(gamma1 t) - 1), largest at gamma1 t = 1.594
+    t = design.best_time((0, 0, -1), "z", 0, np.linspace(0.1, 10, 100), "gamma1",
+                         prior={"omega": (2, 2), "kappa": (1, 1), "gamma1": (0.5, 0.5), "gamma2": (0.1, 0.1)},
+                         n_prior=1, rng=np.random.default_rng(0))
+    assert t == pytest.approx(1.594 / 0.5, abs=0.1)
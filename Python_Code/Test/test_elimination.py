@@ -0,0 +1,54 @@
+import numpy as np
+
+import propagator
+from measurement import excited_probability
+from sampling import ShotSampler
+from utils import EliminationAlgorithm, Measurement, drive, elimination
+
+PARAMS = [2.0, 1000.0, 1.0, 0.3, 0.1]  # omega, u, kappa, gamma1, gamma2
+V0 = [0.0, 0.0, -1.0]
+
+
+def test_keeps_the_true_candidate():
+    candidates = np.array([0.2, 0.55, 1.0, 1.7, 2.4])
+    result = EliminationAlgorithm(candidates, 2, 100000, 1e-3, PARAMS, V0, sampler=ShotSampler(1))
+    assert result.reason == "converged"
+    assert result.value == 1.0
+    assert result.shots == 100000 * result.rounds
+
+
+def test_rejects_a_survivor_far_from_the_reference():
+    # Measured exactly, only aliases far from kappa = 1 remain to choose from
+    core = elimination(np.array([0.2, 2.4]), 2, 1000, 1e-3, PARAMS, V0, reference_tolerance=0.012,
+                       sampler=ShotSampler(1))
+    result = drive(core, lambda request: (round(request.expected * 10**6), 10**6))
+    assert result.value is None and result.reason in ("rejected", "exhausted")
+
+
+def test_exhausted_when_nothing_matches():
+    core = elimination(np.array([0.5, 1.0, 1.5]), 2, 1000, 1e-3, PARAMS, V0, sampler=ShotSampler(1))
+    # Every candidate's probability is far above an all-zeros record
+    result = drive(core, lambda request: (0, 1000))
+    assert result.value is None and result.reason == "exhausted" and result.rounds == 1
+
+
+def test_core_yields_one_measurement_per_round():
+    core = elimination(np.array([0.5, 1.0, 1.5]), 2, 500, 1e-3, PARAMS, V0, sampler=ShotSampler(2))
+    requests = []
+
+    def measure(request):
+        requests.append(request)
+        return round(request.expected * 500), 500
+
+    result = drive(core, measure)
+    assert len(requests) == result.rounds
+    assert all(isinstance(r, Measurement) and r.shots == 500 and r.stop is None for r in requests)
+    p = excited_probability(propagator.evolve(PARAMS, V0, requests[0].t))
+    assert np.isclose(requests[0].expected, p)
+
+
+def test_adaptive_rounds_stop_on_the_interval():
+    candidates = np.array([0.2, 0.55, 1.0, 1.7, 2.4])
+    result = EliminationAlgorithm(candidates, 2, 10**6, 1e-3, PARAMS, V0, sampler=ShotSampler(3), batch=1000)
+    assert result.value == 1.0
+    assert result.shots < 10**6 * result.rounds
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import fleet
+import utils
+from qubit import Qubit
+
+QUBITS = [Qubit(2, 1, 0.3, 0.1), Qubit(1.5, 0.8, 0.5, 0.05), Qubit(3, 1.2, 0.2, 0.2)]
+
+
+def test_results_do_not_depend_on_the_worker_count():
+    strip = lambda rows: [{k: v for k, v in r.items() if not k.endswith("_seconds")} for r in rows]
+    serial = fleet.identify_fleet(QUBITS, 20000, workers=1, seed=5)
+    parallel = fleet.identify_fleet(QUBITS, 20000, workers=2, chunksize=1, seed=5)
+    assert strip(serial) == strip(parallel)
+    assert [r["index"] for r in serial] == [0, 1, 2]
+
+
+def test_estimates_are_close_to_the_truth():
+    result = fleet.identify(QUBITS[0], 200000)
+    for name in fleet.PARAMETERS:
+        assert result[name] == pytest.approx(result[f"{name}_true"], rel=0.1, abs=0.02)
+
+
+def test_unknown_method_fails_before_running():
+    with pytest.raises(ValueError, match="unknown method"):
+        fleet.identify_fleet(QUBITS, 1000, workers=1, method="bogus")
+
+
+def test_gamma2_log_failure_is_reported_as_none(monkeypatch):
+    def fail(*args):
+        raise utils.LogArgumentError("log argument non-positive")
+
+    monkeypatch.setattr("estimator.gamma2_from", fail)
+    result = fleet.identify(QUBITS[0], 1000, parameters=("gamma2",))
+    assert result["gamma2"] is None
+
+
+def test_load_qubits_reads_csv_and_json(tmp_path):
+    csv = tmp_path / "q.csv"
+    csv.write_text("omega,kappa,gamma1,gamma2\n2,1,0.3,0.1\n")
+    json = tmp_path / "q.json"
+    json.write_text('[{"omega": 2, "kappa": 1, "gamma1": 0.3, "gamma2": 0.1}, [1, 1, 0.2, 0.1]]')
+    assert [q.get_param() for q in fleet.load_qubits(str(csv))] == [[2, 1, 0.3, 0.1]]
+    assert np.allclose([q.get_param() for q in fleet.load_qubits(str(json))], [[2, 1, 0.3, 0.1], [1, 1, 0.2, 0.1]])
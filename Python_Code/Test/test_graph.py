@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("PyQt5.QtWebEngineWidgets")
+
+import graph
+from qubit import Qubit
+from sampling import ShotSampler
+
+
+def run_worker(parameter, **kwargs):
+    worker = graph.EstimationWorker(parameter, Qubit(2, 1, 0.3, 0.1), 10000, ShotSampler(0), **kwargs)
+    outcome = []
+    worker.signals.finished.connect(lambda name, value, estimator: outcome.append(("finished", value)))
+    worker.signals.failed.connect(lambda name, reason: outcome.append(("failed", reason)))
+    return worker, outcome
+
+
+def test_worker_finishes_with_the_estimate():
+    worker, outcome = run_worker("gamma1")
+    worker.run()
+    assert outcome[0][0] == "finished" and outcome[0][1] == pytest.approx(0.3, abs=0.05)
+
+
+def test_cancelled_before_start():
+    worker, outcome = run_worker("kappa")
+    worker.cancel()
+    worker.run()
+    assert outcome == [("failed", "cancelled")]
+
+
+def test_any_error_is_reported(monkeypatch):
+    def broken(*args, **kwargs):
+        raise ZeroDivisionError("boom")
+
+    monkeypatch.setattr(graph.Estimator, "estimate_gamma1", broken)
+    worker, outcome = run_worker("gamma1")
+    worker.run()
+    assert outcome == [("failed", "ZeroDivisionError('boom')")]
@@ -0,0 +1,11 @@
+import import_budget
+
+# Headless modules beyond the core that must not pull in the deferred ones either
+HEADLESS = ("cache", "measurement", "sequential", "smc", "joint", "design", "stream", "dataset",
+            "jumps", "backend", "benchmark")
+
+
+def test_core_does_not_import_deferred_modules():
+    elapsed, loaded = import_budget.measure(import_budget.CORE_MODULES + HEADLESS, repeat=1)
+    assert loaded == []
+    assert elapsed > 0
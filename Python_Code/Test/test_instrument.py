@@ -0,0 +1,43 @@
+import json
+
+import instrument
+from estimator import Estimator
+from qubit import Qubit
+from sampling import ShotSampler
+from system import System
+
+
+def test_disabled_hooks_record_nothing():
+    instrument.reset()
+    instrument.count("x")
+    instrument.observe("y", 1.0)
+    with instrument.timer("z"):
+        pass
+    data = instrument.profile()
+    assert data["counters"] == {} and data["values"] == {} and data["timers"] == {}
+
+
+def test_session_counts_measured_and_drawn_shots():
+    qubit = Qubit(2, 1, 0.3, 0.1)
+    with instrument.session():
+        Estimator(System(0, 0, -1), ShotSampler(0)).estimate_gamma1(qubit, 1000)
+        estimator = Estimator(System(0, 0, -1), ShotSampler(0))
+        estimator.estimate_kappa(qubit, 1000)
+    assert not instrument.enabled
+    data = instrument.profile()
+    counters = data["counters"]
+    assert counters["shots.measured"] == 2000 + estimator.last_elimination.shots
+    assert counters["shots.drawn"] > counters["shots.measured"]
+    assert counters["elimination.rounds"] == estimator.last_elimination.rounds
+    assert data["timers"]["estimator.kappa"]["calls"] == 1
+
+
+def test_values_and_export(tmp_path):
+    with instrument.session():
+        for v in (3, 1, 2):
+            instrument.observe("v", v)
+    path = tmp_path / "profile.json"
+    instrument.write(str(path))
+    values = json.loads(path.read_text())["values"]["v"]
+    assert values == {"count": 3, "mean": 2.0, "min": 1, "max": 3}
+    assert "v" in instrument.summary()
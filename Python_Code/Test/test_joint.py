@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import joint
+import propagator
+from qubit import Qubit
+from sampling import ShotSampler
+
+THETA = np.array([2.0, 1.0, 0.3, 0.1])  # omega, kappa, gamma1, gamma2
+
+
+def test_van_loan_gradient_matches_finite_differences():
+    params = np.array([2.0, 3.0, 1.0, 0.3, 0.1])
+    P, dP = propagator.propagator_gradient(params, 1.3)
+    assert np.allclose(P, propagator.propagator(params, 1.3))
+    h = 1e-6
+    for i in range(5):
+        step = np.eye(5)[i] * h
+        numeric = (propagator.propagator(params + step, 1.3) - propagator.propagator(params - step, 1.3)) / (2 * h)
+        assert np.allclose(dP[i], numeric, atol=1e-7)
+
+
+def test_settings_gradient_matches_finite_differences():
+    settings = joint.schedule(np.linspace(0.3, 3, 5))
+    p, dp = settings.gradient(THETA)
+    assert np.allclose(p, settings.probabilities(THETA)[0])
+    h = 1e-6
+    for i in range(4):
+        step = np.eye(4)[i] * h
+        numeric = (settings.probabilities(THETA + step)[0] - settings.probabilities(THETA - step)[0]) / (2 * h)
+        assert np.allclose(dp[:, i], numeric, atol=1e-7)
+
+
+def test_fisher_is_the_curvature_of_the_expected_log_likelihood():
+    settings = joint.schedule(np.linspace(0.3, 3, 5))
+    shots = np.full(len(settings), 1000.0)
+    expected = shots * settings.probabilities(THETA)[0]  # noiseless counts
+    ll = lambda theta: joint.log_likelihood(settings, shots, expected, theta[None, :])[0]
+    h = 1e-4
+    hessian = np.empty((4, 4))
+    for i in range(4):
+        for j in range(4):
+            ei, ej = np.eye(4)[i] * h, np.eye(4)[j] * h
+            hessian[i, j] = (ll(THETA + ei + ej) - ll(THETA + ei - ej) - ll(THETA - ei + ej)
+                             + ll(THETA - ei - ej)) / (4 * h * h)
+    assert np.allclose(joint.fisher(settings, shots, THETA), -hessian, rtol=1e-3)
+
+
+def test_fit_recovers_the_parameters_within_their_errors():
+    qubit = Qubit(*THETA)
+    settings = joint.schedule()
+    shots = settings.allocate(200000)
+    fit = joint.fit(settings, shots, joint.simulate(qubit, settings, shots, ShotSampler(0)))
+    for name, truth in zip(joint.PARAMETERS, THETA):
+        assert abs(fit.value[name] - truth) < 5 * fit.stderr[name]
+    assert fit.shots == 200000
+
+
+def test_allocate_spends_exactly_n():
+    weights = np.r_[0.9, np.full(99, 0.1 / 99)]
+    settings = joint.Settings((0, 0, -1), "z", 0, np.linspace(0.1, 2, 100), weights)
+    for n in (100, 157, 10000):
+        shots = settings.allocate(n)
+        assert shots.sum() == n and shots.min() >= 1
+    with pytest.raises(ValueError):
+        settings.allocate(99)
+
+
+def test_concatenate_keeps_the_weights():
+    a = joint.Settings((0, 0, -1), "z", 0, [0.5, 1.0], [3, 1])
+    b = joint.Settings((0, 1, 0), "x_rot", 0, [0.5, 1.0])
+    both = joint.Settings.concatenate(a, b)
+    assert np.allclose(both.weights, [0.375, 0.125, 0.25, 0.25])
+    uniform = joint.Settings.concatenate(joint.Settings((0, 0, -1), "z", 0, [1, 2, 3]), b)
+    assert np.allclose(uniform.weights, 0.2)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import jumps
+from control import Control
+from qubit import Qubit
+from system import System
+
+QUBIT = Qubit(2, 1, 0.3, 0.1)
+TIMES = np.array([0.0, 0.5, 1.0, 2.0])
+
+
+@pytest.mark.parametrize("control, v0", [(Control(0), (0, 1, 0)), (Control(1.5), (0, 0, -1)),
+                                         (Control.sequence([(3, 0.3), (0, 0.4)]), (0, 0, -1))])
+def test_ensemble_average_matches_the_bloch_solution(control, v0):
+    n = 20000
+    average = jumps.ensemble_average(QUBIT, control, v0, TIMES, n, dt=0.01, rng=np.random.default_rng(0))
+    exact = System(*v0).trajectory(QUBIT, control, TIMES)
+    # Each component is the mean of n values in [-1, 1]
+    assert np.abs(average - exact).max() < 5 / np.sqrt(n)
+
+
+def test_mixed_initial_state_is_sampled_as_its_eigenstates():
+    average = jumps.ensemble_average(QUBIT, Control(0), (0, 0, 0.4), [0.0], 20000, rng=np.random.default_rng(1))
+    assert np.allclose(average[0], [0, 0, 0.4], atol=0.03)
+
+
+def test_z_readouts_collapse_the_coherence():
+    chunk = next(jumps.trajectories(QUBIT, Control(0), (0, 1, 0), TIMES, 500, dt=0.01,
+                                    rng=np.random.default_rng(2), measure_basis="z"))
+    assert np.allclose(chunk.states[:, 0], [0, 1, 0])
+    # After the first readout every trajectory is a z eigenstate, and stays one without a drive
+    assert np.allclose(chunk.states[:, 1:, :2], 0)
+    assert set(np.unique(chunk.readouts)) <= {0, 1}
+
+
+def test_readouts_follow_the_relaxation():
+    n = 20000
+    chunk = next(jumps.trajectories(QUBIT, Control(0), (0, 0, -1), TIMES, n, dt=0.01, chunk=n,
+                                    rng=np.random.default_rng(3), measure_basis="z"))
+    assert np.allclose(chunk.readouts.mean(axis=0), np.exp(-QUBIT.gamma1 * TIMES), atol=5 / np.sqrt(n))
+
+
+def test_non_projective_basis_is_rejected():
+    with pytest.raises(ValueError):
+        next(jumps.trajectories(QUBIT, Control(0), (0, 0, -1), TIMES, 10,
+                                measure_basis=np.diag([0.2, 0.9])))
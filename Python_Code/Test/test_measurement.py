@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import measurement
+from sampling import ShotSampler
+
+SX = np.array([[0, 1], [1, 0]], dtype=complex)
+SY = np.array([[0, -1j], [1j, 0]])
+SZ = np.array([[1, 0], [0, -1]], dtype=complex)
+
+
+def density(v):
+    return 0.5 * (np.eye(2) + v[0] * SX + v[1] * SY + v[2] * SZ)
+
+
+@pytest.fixture
+def states():
+    v = np.random.default_rng(0).normal(size=(20, 3))
+    return v / np.linalg.norm(v, axis=1, keepdims=True) * np.random.default_rng(1).uniform(0, 1, (20, 1))
+
+
+def test_affine_form_equals_the_trace(states):
+    O = np.array([[0.3, 0.2 - 0.1j], [0.2 + 0.1j, 0.9]])
+    a, c = measurement.affine(O)
+    for v in states:
+        assert a + c @ v == pytest.approx(np.real(np.trace(O @ density(v))))
+
+
+def test_named_bases_match_their_projectors(states):
+    table = measurement.Table(["z", "x_rot", "y_rot"])
+    projectors = [np.diag([0, 1]), measurement.rotated(SX), measurement.rotated(SY)]
+    expected = [[np.real(np.trace(P @ density(v))) for P in projectors] for v in states]
+    assert np.allclose(table.probabilities(states), expected)
+
+
+def test_axis_measures_the_minus_n_eigenstate():
+    table = measurement.Table([(1, 0, 0), (0, 0, 2)])
+    assert np.allclose(table.probabilities([[-1, 0, 0], [0, 0, 1]]), [[1, 0.5], [0.5, 0]])
+
+
+def test_sample_shape_and_shot_count():
+    sampler = ShotSampler(0)
+    counts = measurement.sample(np.zeros((5, 3)), ["z", "x_rot"], 1000, sampler)
+    assert counts.shape == (5, 2)
+    assert sampler.shots == 10000
+    assert abs(counts.mean() / 1000 - 0.5) < 0.02
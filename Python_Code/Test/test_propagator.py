@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from scipy.integrate import solve_ivp
+from scipy.linalg import expm
+
+import propagator
+
+PARAMS = [2.0, 3.0, 1.0, 0.3, 0.1]  # omega, u, kappa, gamma1, gamma2
+
+
+def bloch_rhs(params):
+    G = propagator.generator(*params)
+    return lambda t, v: G[:3, :3] @ v + G[:3, 3]
+
+
+@pytest.mark.parametrize("t", [0.0, 1e-3, 0.7, 5.0, 40.0])
+def test_expm_matches_scipy(t):
+    G = propagator.generator(*PARAMS) * t
+    assert np.allclose(propagator.expm(G), expm(G), atol=1e-12)
+
+
+def test_evolve_matches_ode_solution():
+    v0 = np.array([0.0, 1.0, 0.0])
+    times = np.linspace(0, 4, 9)
+    ode = solve_ivp(bloch_rhs(PARAMS), (0, 4), v0, t_eval=times, rtol=1e-10, atol=1e-12)
+    exact = propagator.evolve(np.tile(PARAMS, (len(times), 1)), v0, times)
+    assert np.allclose(exact, ode.y.T, atol=1e-8)
+
+
+def test_batch_equals_one_by_one():
+    rng = np.random.default_rng(0)
+    params = rng.uniform(0.1, 2, (4, 3, 5))
+    t = rng.uniform(0, 3, (4, 3))
+    batch = propagator.propagator(params, t)
+    for i in range(4):
+        for j in range(3):
+            assert np.allclose(batch[i, j], propagator.propagator(params[i, j], t[i, j]))
+
+
+def test_relaxes_to_ground_state():
+    v = propagator.evolve([1.0, 0.0, 0.5, 0.4, 0.2], [0, 0, -1], 200.0)
+    assert np.allclose(v, [0, 0, 1], atol=1e-12)
+
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from control import Control
+from estimator import Estimator
+from qubit import Qubit, QubitArray, nominal
+from sampling import ShotSampler
+from system import System
+
+CENTER = Qubit(2, 1, 0.3, 0.1)
+
+
+@pytest.fixture
+def ensemble():
+    return QubitArray.around(CENTER, 200, {"omega": 0.05}, rng=np.random.default_rng(0))
+
+
+def test_evolve_averages_the_members(ensemble):
+    control = Control(0.5)
+    system = System(0, 1, 0)
+    system.evolve(ensemble, control, 1.3)
+    members = []
+    for qubit in ensemble:
+        single = System(0, 1, 0)
+        single.evolve(qubit, control, 1.3)
+        members.append(single.get_coordinates())
+    assert np.allclose(system.members, members)
+    assert np.allclose(system.get_coordinates(), np.mean(members, axis=0))
+
+
+def test_chained_ensemble_evolves_equal_one_evolve(ensemble):
+    chained, single = System(0, 1, 0), System(0, 1, 0)
+    chained.evolve(ensemble, Control(0), 1.0)
+    chained.evolve(ensemble, Control(0), 1.0)
+    single.evolve(ensemble, Control(0), 2.0)
+    assert np.allclose(chained.get_coordinates(), single.get_coordinates())
+
+
+def test_single_qubit_after_an_ensemble_needs_initialize(ensemble):
+    system = System(0, 1, 0)
+    system.evolve(ensemble, Control(0), 1.0)
+    with pytest.raises(ValueError):
+        system.evolve(CENTER, Control(0), 1.0)
+    system.initialize()
+    system.evolve(CENTER, Control(0), 1.0)
+
+
+def test_indexing_and_nominal(ensemble):
+    assert isinstance(ensemble[3], Qubit)
+    assert len(ensemble[:10]) == 10 and len(ensemble[ensemble.omega > 2]) < len(ensemble)
+    assert nominal(ensemble).omega == pytest.approx(ensemble.omega.mean())
+    assert nominal(CENTER) is CENTER
+
+
+@pytest.mark.parametrize("name, v0", [("gamma1", (0, 0, -1)), ("kappa", (0, 0, -1)), ("omega", (0, 1, 0))])
+def test_protocols_accept_an_ensemble(ensemble, name, v0):
+    value = getattr(Estimator(System(*v0), ShotSampler(1)), f"estimate_{name}")(ensemble, 200000)
+    assert value == pytest.approx(getattr(CENTER, name), rel=0.05)
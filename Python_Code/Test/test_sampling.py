@@ -0,0 +1,48 @@
+import asyncio
+
+import numpy as np
+
+import sampling
+from sampling import ShotSampler
+
+
+def test_same_seed_same_draws():
+    a, b = ShotSampler(7), ShotSampler(7)
+    assert np.array_equal(a.counts([0.1, 0.5, 0.9], 1000), b.counts([0.1, 0.5, 0.9], 1000))
+
+
+def test_counts_track_shots_and_broadcast():
+    sampler = ShotSampler(0)
+    k = sampler.counts(np.array([0.0, 1.0, 0.5]), 100)
+    assert k[0] == 0 and k[1] == 100
+    assert sampler.shots == 300
+
+
+def test_frequency_is_unbiased():
+    p = ShotSampler(1).frequency(np.full(2000, 0.3), 1000)
+    assert abs(p.mean() - 0.3) < 3 * np.sqrt(0.3 * 0.7 / 2e6)
+
+
+def test_spawned_streams_are_independent_and_reproducible():
+    first = [s.counts(0.5, 10**6) for s in ShotSampler(3).spawn(3)]
+    again = [s.counts(0.5, 10**6) for s in ShotSampler(3).spawn(3)]
+    assert first == again
+    assert len(set(first)) == 3
+
+
+def test_counts_until_stops_on_the_rule_or_the_cap():
+    successes, shots = ShotSampler(2).counts_until(0.5, lambda p, se: se <= 0.01, 100, 10**6)
+    assert shots % 100 == 0 and np.sqrt(0.25 / shots) <= 0.0102
+    successes, shots = ShotSampler(2).counts_until(0.5, lambda p, se: False, 300, 1000)
+    assert shots == 1000
+
+
+def test_acounts_until_matches_counts_until():
+    stop = lambda p, se: se <= 0.02
+    expected = ShotSampler(4).counts_until(0.3, stop, 50, 10**5)
+    sampler = ShotSampler(4)
+
+    async def measure(size):
+        return sampler.counts(0.3, size)
+
+    assert asyncio.run(sampling.acounts_until(measure, stop, 50, 10**5)) == expected
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from estimator import Estimator
+from qubit import Qubit
+from sampling import ShotSampler
+from sequential import SequentialEstimator
+from system import System
+from utils import alias_candidates, omega_candidates
+
+QUBIT = Qubit(2, 1, 0.3, 0.1)
+
+
+def test_gamma1_interval_reaches_the_precision():
+    result = SequentialEstimator(System(0, 0, -1), ShotSampler(0)).estimate_gamma1(QUBIT, 0.01)
+    low, high = result.interval
+    assert high - low <= 0.02 + 1e-12
+    assert low - 0.01 <= QUBIT.gamma1 <= high + 0.01
+    assert result.shots < result.baseline_shots
+
+
+def test_gamma2_interval_reaches_the_precision():
+    result = SequentialEstimator(System(0, 1, 0), ShotSampler(1)).estimate_gamma2(QUBIT, 0.01)
+    assert result.interval[1] - result.interval[0] <= 0.02 + 1e-12
+    assert result.value == pytest.approx(QUBIT.gamma2, abs=0.03)
+
+
+@pytest.mark.parametrize("name, v0", [("kappa", (0, 0, -1)), ("omega", (0, 1, 0))])
+def test_elimination_picks_the_true_alias(name, v0):
+    estimator = SequentialEstimator(System(*v0), ShotSampler(2))
+    result = getattr(estimator, f"estimate_{name}")(QUBIT, 0.01)
+    assert result.elimination.reason == "converged"
+    assert result.value == pytest.approx(getattr(QUBIT, name), abs=0.05)
+    # A wrong alias would be off by far more than the interval
+    assert result.alias_gap > 10 * (result.interval[1] - result.interval[0])
+
+
+def test_omega_candidates_survive_shot_noise_past_the_arccos_domain():
+    # (1 - 2 s1) e^(gamma t) > 1: clipped to theta = 0 instead of NaN
+    candidates = omega_candidates(0.0, 1.0, 0.3, 0.1)
+    assert len(candidates) > 0 and np.all(np.isfinite(candidates))
+    assert np.allclose(candidates, alias_candidates(0.0, range(-30, 30)))
+
+
+def test_estimator_omega_runs_elimination_when_the_first_frequency_is_extreme(monkeypatch):
+    estimator = Estimator(System(0, 1, 0), ShotSampler(3))
+    monkeypatch.setattr(estimator, "_simulate_rotated", lambda *args: 0.0)
+    estimator.estimate_omega(QUBIT, 10000)
+    assert estimator.last_elimination.rounds > 0
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import smc
+from estimator import Estimator
+from qubit import Qubit
+from sampling import ShotSampler
+from system import System
+
+
+def test_update_is_bayes_rule():
+    pf = smc.ParticleFilter(0, 1, 500, np.random.default_rng(0))
+    x = pf.particles.copy()
+    p = 0.2 + 0.6 * x
+    pf.update(p, 3, 5)  # weak data: no resampling
+    likelihood = p ** 3 * (1 - p) ** 2
+    assert np.array_equal(pf.particles, x)
+    assert np.allclose(pf.weights, likelihood / likelihood.sum())
+
+
+def test_resampling_keeps_the_posterior_mean():
+    pf = smc.ParticleFilter(0, 1, 20000, np.random.default_rng(1))
+    pf.update(pf.particles, 60, 100)  # p = x: posterior Beta(61, 41)
+    assert pf.ess() == len(pf.particles)  # resampled
+    assert np.sum(pf.weights * pf.particles) == pytest.approx(61 / 102, abs=0.005)
+
+
+def test_quantiles_of_a_weighted_cloud():
+    particles = np.arange(100.0)
+    assert smc.quantiles(particles, np.full(100, 0.01), [0.105, 0.505]) == (10.0, 50.0)
+
+
+def test_no_information_where_every_particle_agrees():
+    pf = smc.ParticleFilter(0, 1, 10, np.random.default_rng(0))
+    p = np.column_stack([np.full(10, 0.3), np.linspace(0.1, 0.9, 10)])
+    gain = pf.expected_information(p)
+    assert gain[0] == pytest.approx(0) and gain[1] > 0
+
+
+@pytest.mark.parametrize("name, v0", [("kappa", (0, 0, -1)), ("omega", (0, 1, 0))])
+def test_posterior_covers_the_truth(name, v0):
+    qubit = Qubit(2, 1, 0.3, 0.1)
+    estimator = Estimator(System(*v0), ShotSampler(4))
+    mean = getattr(estimator, f"estimate_{name}")(qubit, 20000, method="smc")
+    posterior = estimator.last_posterior
+    low, high = posterior.interval
+    assert low <= getattr(qubit, name) <= high
+    assert mean == pytest.approx(getattr(qubit, name), abs=0.05)
+    assert posterior.shots == 20000
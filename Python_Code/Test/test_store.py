@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import store
+from store import ResultStore
+
+
+def test_key_is_canonical():
+    plain = {"qubit": [2.0, 1.0], "n": 1000, "seed": np.random.SeedSequence(5, spawn_key=(1,))}
+    numpy = {"n": np.int64(1000), "seed": np.random.SeedSequence(5, spawn_key=(1,)), "qubit": np.array([2.0, 1.0])}
+    assert store.key(plain) == store.key(numpy)
+    assert store.key(plain) != store.key(dict(plain, n=1001))
+
+
+def test_round_trip_and_counters(tmp_path):
+    results = ResultStore(str(tmp_path))
+    assert results.get({"a": 1}) is None
+    results.put({"a": 1}, {"value": 0.5})
+    assert {"a": 1} in results and len(results) == 1
+    assert results.get({"a": 1}) == {"value": 0.5}
+    assert (results.hits, results.misses) == (1, 1)
+
+
+def test_concurrent_writers_never_leave_partial_results(tmp_path):
+    results = ResultStore(str(tmp_path))
+    payload = {"values": list(range(5000))}
+
+    def write_and_read(i):
+        results.put({"job": i % 4}, payload)
+        return results.get({"job": i % 4})
+
+    with ThreadPoolExecutor(8) as pool:
+        assert all(r == payload for r in pool.map(write_and_read, range(200)))
+    leftovers = [name for shard in os.listdir(tmp_path) for name in os.listdir(tmp_path / shard)
+                 if not name.endswith(".json")]
+    assert leftovers == [] and len(results) == 4
+
+
+def test_failed_write_keeps_the_original_error_and_no_temporary(tmp_path, monkeypatch):
+    results = ResultStore(str(tmp_path))
+    with pytest.raises(TypeError):
+        results.put({"a": 1}, object())  # not JSON-serialisable
+    real_replace = os.replace
+
+    def replace_then_fail(src, dst):
+        real_replace(src, dst)
+        raise OSError("disk gone")
+
+    monkeypatch.setattr(os, "replace", replace_then_fail)
+    with pytest.raises(OSError, match="disk gone"):
+        results.put({"b": 1}, 1)
+    monkeypatch.undo()
+    names = [name for shard in os.listdir(tmp_path) for name in os.listdir(tmp_path / shard)]
+    assert not any(name.endswith(".tmp") for name in names)
+
+
+def test_prune_drops_least_recently_used_first(tmp_path):
+    results = ResultStore(str(tmp_path))
+    for i in range(5):
+        results.put({"i": i}, i)
+        os.utime(results._file(store.key({"i": i})), (1000 + i, 1000 + i))
+    results.get({"i": 0})  # used now: the most recent
+    size = os.path.getsize(results._file(store.key({"i": 0})))
+    assert results.prune(max_bytes=2 * size) == 3
+    assert sorted(results.keys()) == sorted(store.key({"i": i}) for i in (0, 4))
+    assert results.prune(max_age=3600) == 1  # i = 4, last used long ago
+    assert results.get({"i": 0}) == 0
+    assert results.clear() == 1 and len(results) == 0
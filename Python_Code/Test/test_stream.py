@@ -0,0 +1,51 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import joint
+import stream
+from qubit import Qubit
+from sampling import ShotSampler
+
+QUBIT = Qubit(2, 1, 0.3, 0.1)
+SETTINGS = joint.schedule(np.linspace(0.25, 4, 8))
+
+
+def test_counts_aggregate_records_per_setting():
+    records = list(stream.simulate(QUBIT, SETTINGS, 50, chunk=64, sampler=ShotSampler(0)))
+    assert len(records) == 50 * len(SETTINGS)
+    counts = stream.Counts()
+    for record in records:
+        counts.add(record)
+    settings, shots, successes = counts.arrays()
+    assert len(counts) == len(SETTINGS)
+    assert np.all(shots == 50)
+    assert successes.sum() == sum(r.outcome for r in records)
+
+
+def test_records_are_interleaved():
+    records = list(stream.simulate(QUBIT, SETTINGS, 100, chunk=240, sampler=ShotSampler(1)))
+    first = {(r.basis, r.u, r.t) for r in records[:240]}
+    assert len(first) == len(SETTINGS)
+
+
+def test_online_fit_refreshes_and_converges():
+    online = stream.OnlineEstimator(refresh=20000, min_shots=20000)
+    fits = list(online.updates(stream.simulate(QUBIT, SETTINGS, 5000, sampler=ShotSampler(2))))
+    assert len(fits) == 5000 * len(SETTINGS) // 20000
+    assert fits[-1] is online.last_fit
+    for name in joint.PARAMETERS:
+        assert fits[-1].value[name] == pytest.approx(getattr(QUBIT, name), abs=5 * fits[-1].stderr[name])
+
+
+def test_async_updates_match_the_sync_ones():
+    sync = stream.OnlineEstimator(refresh=10000, min_shots=10000)
+    expected = [f.value for f in sync.updates(stream.simulate(QUBIT, SETTINGS, 1000, sampler=ShotSampler(3)))]
+
+    async def run():
+        online = stream.OnlineEstimator(refresh=10000, min_shots=10000)
+        records = stream.asimulate(QUBIT, SETTINGS, 1000, sampler=ShotSampler(3))
+        return [f.value async for f in online.aupdates(records)]
+
+    assert asyncio.run(run()) == expected
@@ -0,0 +1,35 @@
+import numpy as np
+
+from control import Control
+from qubit import Qubit
+from system import System
+
+
+def test_evolve_batch_broadcasts_times_params_and_states():
+    times = np.array([0.5, 1.0, 2.0])
+    params = np.array([[2.0, 0.0, 1.0, 0.3, 0.1], [1.0, 5.0, 0.5, 0.2, 0.05]])
+    v0 = np.array([[0, 0, -1], [0, 1, 0]], dtype=float)
+    out = System.evolve_batch(times[None, :], params[:, None, :], v0[:, None, :])
+    assert out.shape == (2, 3, 3)
+    for i in range(2):
+        for j in range(3):
+            assert np.allclose(out[i, j], System.evolve_batch(times[j], params[i], v0[i]))
+
+
+def test_trajectory_matches_evolve_and_keeps_the_state():
+    qubit, control = Qubit(2, 1, 0.3, 0.1), Control(u=0.5)
+    system = System(0, 1, 0)
+    path = system.trajectory(qubit, control, [0.0, 0.5, 1.5])
+    assert system.get_coordinates() == [0, 1, 0]
+    assert np.allclose(path[0], [0, 1, 0])
+    system.evolve(qubit, control, 1.5)
+    assert np.allclose(path[-1], system.get_coordinates())
+
+
+def test_chained_evolves_equal_one_evolve():
+    qubit, control = Qubit(2, 1, 0.3, 0.1), Control(u=2)
+    chained, single = System(0, 0, -1), System(0, 0, -1)
+    chained.evolve(qubit, control, 0.4)
+    chained.evolve(qubit, control, 0.6)
+    single.evolve(qubit, control, 1.0)
+    assert np.allclose(chained.get_coordinates(), single.get_coordinates())
@@ -0,0 +1,362 @@
+import asyncio
+import json
+
+import numpy as np
+
+from qubit import Qubit, nominal
+from control import Control
+from system import System
+from estimator import _elimination_batch
+from utils import alias_candidates, elimination, excited_probability, gamma2_from, omega_candidates, \
+    rotated_excited_probability
+import joint
+import sampling
+
+# Asynchronous measurement backend.
+#
+# Measurements of the true system are requests (device, preparation, basis,
+# u, t, shots) answered with a number of 1 outcomes. AsyncBackend queues
+# them (a bounded queue, so producers wait when the instrument falls
+# behind), gathers whatever arrives within `linger` into one batch, merges
+# identical settings, and sends the batch over one of a pool of persistent
+# connections. Wire format: one JSON object per line,
+#
+#     -> {"id": 7, "jobs": [[device, x, y, z, basis, u, t, shots], ...]}
+#     <- {"id": 7, "successes": [k, ...]}    or    {"id": 7, "error": "..."}
+#
+# SimulatorServer answers that protocol from the simulator, so everything
+# can be exercised offline.
+
+
+class BackendError(Exception):
+    """The backend rejected a request."""
+
+
+class SimulatorServer:
+    """Local stand-in for the instrument controller, simulating `devices` (name -> Qubit or QubitArray)."""
+
+    # CONSTRUCTOR
+    def __init__(self, devices: dict, sampler=None, latency: float = 0.0):
+        self.devices = devices
+        self.sampler = sampler
+        self.latency = latency  # simulated round-trip delay per batch, in seconds
+        self.server = None
+        self.batches = 0
+        self.jobs = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> tuple:
+        """Start listening; returns the (host, port) actually bound."""
+        self.server = await asyncio.start_server(self._serve, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @property
+    def address(self) -> tuple:
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def _serve(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                try:
+                    reply = {"id": message["id"], "successes": self.run(message["jobs"])}
+                except (KeyError, ValueError, TypeError) as error:
+                    reply = {"id": message.get("id"), "error": f"{type(error).__name__}: {error}"}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # Client gone, or the loop shutting down: end this connection quietly
+            pass
+        finally:
+            writer.close()
+
+    def run(self, jobs) -> list:
+        """Successes for every job, one batched evaluation per device."""
+        self.batches += 1
+        self.jobs += len(jobs)
+        successes = [0] * len(jobs)
+        by_device = {}
+        for i, job in enumerate(jobs):
+            by_device.setdefault(job[0], []).append(i)
+        for device, rows in by_device.items():
+            qubit = self.devices[device]
+            settings = joint.Settings([jobs[i][1:4] for i in rows], [jobs[i][4] for i in rows],
+                                      [jobs[i][5] for i in rows], [jobs[i][6] for i in rows])
+            shots = np.array([jobs[i][7] for i in rows], dtype=int)
+            counts = joint.simulate(qubit, settings, shots, self.sampler)
+            for i, k in zip(rows, counts.tolist()):
+                successes[i] = k
+        return successes
+
+
+class AsyncBackend:
+    """Client for the measurement protocol, batching and coalescing concurrent requests.
+
+    At most `max_pending` requests wait in the queue; `measure` blocks the
+    caller beyond that. A batch holds up to `max_batch` requests and is sent
+    once `linger` seconds have passed since its first one. Requests that
+    share a setting are merged into one job and its successes split back
+    exactly (hypergeometric). A batch without a reply within `timeout`
+    seconds fails its requests with TimeoutError, and one whose reply is
+    malformed (bad JSON, wrong id or number of results) with BackendError;
+    either way its connection is replaced.
+    """
+
+    # CONSTRUCTOR
+    def __init__(self, host: str, port: int, connections: int = 4, max_batch: int = 512,
+                 linger: float = 0.002, max_pending: int = 4096, timeout: float = 10.0, rng=None):
+        self.host, self.port = host, port
+        self.connections = connections
+        self.max_batch = max_batch
+        self.linger = linger
+        self.timeout = timeout
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.queue = asyncio.Queue(max_pending)
+        self.pool = asyncio.Queue()  # idle connections; None is reconnected on use
+        self.tasks = set()
+        self.batcher = None
+        self.next_id = 0
+        self.requests = 0
+        self.batches = 0
+
+    async def start(self):
+        for _ in range(self.connections):
+            self.pool.put_nowait(None)
+        self.batcher = asyncio.create_task(self._batch())
+
+    async def close(self):
+        tasks = list(self.tasks) if self.batcher is None else [self.batcher, *self.tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Requests never batched fail rather than wait forever
+        while not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(BackendError("backend closed"))
+        while not self.pool.empty():
+            connection = self.pool.get_nowait()
+            if connection is not None:
+                connection[1].close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def measure(self, device: str, v0, basis: str, u: float, t: float, shots: int) -> int:
+        """Number of 1 outcomes in `shots` shots of `device` prepared in v0, driven at u, measured at t."""
+        key = (device, *map(float, v0), basis, float(u), float(t))
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, int(shots), future))
+        self.requests += 1
+        return await future
+
+    async def _batch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.linger
+            while len(items) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            groups = {}
+            for key, shots, future in items:
+                groups.setdefault(key, []).append((shots, future))
+            task = asyncio.create_task(self._send(groups))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _send(self, groups: dict):
+        try:
+            connection = await self.pool.get()
+        except asyncio.CancelledError:
+            _fail(groups, BackendError("backend closed"))
+            raise
+        self.next_id += 1
+        request_id = self.next_id
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+            reader, writer = connection
+            jobs = [[*key, sum(shots for shots, _ in entries)] for key, entries in groups.items()]
+            writer.write(json.dumps({"id": request_id, "jobs": jobs}).encode() + b"\n")
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), self.timeout)
+            if not line:
+                raise ConnectionError("backend closed the connection")
+            reply = json.loads(line)
+            if not isinstance(reply, dict) or reply.get("id") != request_id:
+                raise BackendError(f"unexpected reply to request {request_id}: {line[:200]!r}")
+        except asyncio.CancelledError:
+            self._discard(connection)
+            _fail(groups, BackendError("backend closed"))
+            raise
+        except Exception as error:
+            # Timeout, broken connection or malformed reply: the stream can no longer be trusted
+            self._discard(connection)
+            if not isinstance(error, (OSError, asyncio.TimeoutError, BackendError)):
+                error = BackendError(f"malformed reply to request {request_id}: {error!r}")
+            _fail(groups, error)
+            return
+        self.pool.put_nowait(connection)
+        self.batches += 1
+        try:
+            if "error" in reply:
+                raise BackendError(reply["error"])
+            successes = reply["successes"]
+            if not isinstance(successes, list) or len(successes) != len(groups):
+                raise BackendError(f"reply to request {request_id} does not hold {len(groups)} results")
+            for entries, k in zip(groups.values(), successes):
+                self._split(entries, int(k))
+        except Exception as error:
+            if not isinstance(error, BackendError):
+                error = BackendError(f"malformed reply to request {request_id}: {error!r}")
+            _fail(groups, error)
+
+    def _discard(self, connection):
+        if connection is not None:
+            connection[1].close()
+        self.pool.put_nowait(None)
+
+    def _split(self, entries, successes: int):
+        # Merged requests get an exact hypergeometric share of the merged successes
+        total = sum(shots for shots, _ in entries)
+        for shots, future in entries:
+            k = self.rng.hypergeometric(successes, total - successes, shots) if total > shots else successes
+            successes -= k
+            total -= shots
+            if not future.done():
+                future.set_result(int(k))
+
+
+def _fail(groups: dict, error: Exception):
+    for entries in groups.values():
+        for _, future in entries:
+            if not future.done():
+                future.set_exception(error)
+
+
+class RemoteEstimator:
+    """The Estimator protocols with every measurement of the true system sent to an AsyncBackend device.
+
+    Every protocol is a coroutine with the signature of its Estimator
+    counterpart. Candidate elimination runs locally through the generator
+    core (utils.elimination); only one request per round reaches the
+    backend. The qubit argument supplies the nuisance parameters, as in
+    Estimator. Only method="elimination" is available for kappa and omega:
+    the particle filter simulates its own measurements.
+    """
+
+    # CONSTRUCTOR
+    def __init__(self, system: System, backend: AsyncBackend, device: str, sampler=None):
+        self.system = system
+        self.sampler = sampler  # draws the elimination times; the shots come from the backend
+        self.backend = backend
+        self.device = device
+        self.last_elimination = None  # EliminationResult of the last kappa/omega run
+        self.last_fit = None          # joint.JointFit of the last estimate_joint run
+
+    async def _frequency(self, v0, basis: str, u: float, t: float, n: int) -> float:
+        return await self.backend.measure(self.device, v0, basis, u, t, n) / n
+
+    async def _eliminate(self, core, v0, basis: str, u: float):
+        # Answer each Measurement the core yields through the backend, with
+        # the same stopping rule as local adaptive rounds
+        try:
+            request = next(core)
+            while True:
+                measure = lambda shots: self.backend.measure(self.device, v0, basis, u, request.t, shots)
+                if request.stop is None:
+                    observed = (await measure(request.shots), request.shots)
+                else:
+                    observed = await sampling.acounts_until(measure, request.stop, request.batch, request.shots)
+                request = core.send(observed)
+        except StopIteration as done:
+            return done.value
+
+    async def estimate_gamma1(self, qubit: Qubit, n, t: float = 2.0):
+        p = await self._frequency(self.system.get_coordinates(), "z", 0, t, n)
+        return -np.log(p) / t
+
+    async def estimate_gamma2(self, qubit: Qubit, n: int, t: float = 1.0):
+        v0 = self.system.get_coordinates()
+        s1, s2 = await asyncio.gather(self._frequency(v0, "x_rot", 0, t, n),
+                                      self._frequency(v0, "x_rot", 0, 2 * t, n))
+        return gamma2_from(s1, s2, t, nominal(qubit).get_gamma1())
+
+    async def estimate_kappa(self, qubit: Qubit, n, progress=None, method="elimination", **options):
+        batch = self._batch(method, options)
+        control = Control(u=1000)
+        t = 1 / control.get_u()
+        p = await self._frequency(self.system.get_coordinates(), "z", control.get_u(), t, n)
+        theta = np.arccos(2 * p - 1)
+        KAPPA = alias_candidates(theta, range(-5, 5))
+
+        omega, kappa, gamma1, gamma2 = nominal(qubit).get_param()
+        params = [omega, control.get_u(), kappa, gamma1, gamma2]
+        # Elimination rounds start from the state after the first measurement time, as in Estimator
+        prepared = System.copy(self.system)
+        prepared.evolve(qubit, control, t)
+        v0 = prepared.get_coordinates()
+        core = elimination(KAPPA, 2, n, t, params, v0, excited_probability, reference_tolerance=0.012,
+                           progress=progress, sampler=self.sampler, batch=batch)
+        self.last_elimination = await self._eliminate(core, v0, "z", control.get_u())
+        return self.last_elimination.value
+
+    async def estimate_omega(self, qubit: Qubit, n: int, progress=None, method="elimination", **options):
+        batch = self._batch(method, options)
+        omega, kappa, gamma1, gamma2 = nominal(qubit).get_param()
+        params = [omega, 0, kappa, gamma1, gamma2]
+        v0 = self.system.get_coordinates()
+        t = 1.0
+        s1 = await self._frequency(v0, "x_rot", 0, t, n)
+        OMEGA = omega_candidates(s1, t, gamma1, gamma2)
+        core = elimination(OMEGA, 0, n, t, params, v0, rotated_excited_probability,
+                           progress=progress, sampler=self.sampler, batch=batch)
+        self.last_elimination = await self._eliminate(core, v0, "x_rot", 0)
+        return self.last_elimination.value
+
+    async def estimate_joint(self, qubit: Qubit = None, n: int = None, settings=None, data=None, **options):
+        """Joint fit of n shots split over `settings` (joint.schedule() by default), all measured on the backend.
+
+        As Estimator.estimate_joint; every setting is one request, so the
+        whole dataset goes out in a few batches. `qubit` is not used.
+        """
+        if data is not None:
+            settings, shots, successes = data.arrays()
+        else:
+            settings = joint.schedule() if settings is None else settings
+            shots = settings.allocate(n)
+            successes = np.array(await asyncio.gather(*(
+                self.backend.measure(self.device, settings.v0[i], settings.basis[i], settings.u[i],
+                                     settings.t[i], shots[i]) for i in range(len(settings)))))
+        self.last_fit = joint.fit(settings, shots, successes, **options)
+        return self.last_fit
+
+    @staticmethod
+    def _batch(method: str, options: dict):
+        batch = _elimination_batch(method, options)
+        if method != "elimination":
+            raise ValueError(f"method {method!r} is not available on a remote backend")
+        return batch
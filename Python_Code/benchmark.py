@@ -0,0 +1,155 @@
+import argparse
+import csv
+import json
+import subprocess
+import time
+
+import numpy as np
+
+import cache
+import instrument
+import propagator
+from qubit import Qubit
+from system import System
+from estimator import Estimator, PROTOCOLS
+from sampling import ShotSampler
+from utils import LogArgumentError
+
+FIELDS = ["version", "protocol", "n", "samples", "wall_time", "time_per_qubit",
+          "propagator_calls", "propagator_matrices", "cache_hits", "cache_misses", "shots", "draws", "failures", "failure_rate",
+          "bias", "mae", "rmse", "median_abs_error", "p90_abs_error", "p99_abs_error"]
+
+
+def version_label() -> str:
+    """Short git revision of the working tree, or 'unknown' outside a checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def true_shots(protocol: str, n: int, estimator: Estimator) -> int:
+    """Shots a protocol spent on the true system: its direct measurements plus its elimination rounds."""
+    direct = 2 * n if protocol == "gamma2" else n
+    result = estimator.last_elimination
+    return direct + (result.shots if result is not None else 0)
+
+
+def run_protocol(protocol: str, qubits: list, n: int, seed=None) -> dict:
+    """Run one protocol on every qubit with n shots and summarise cost and accuracy.
+
+    The propagator cache is cleared first, so the cost of a row does not
+    depend on which rows ran before it.
+    """
+    method, v0 = PROTOCOLS[protocol]
+    sampler = ShotSampler(seed)
+    errors = []
+    failures = 0
+    shots = 0
+
+    cache.clear()
+    before = propagator.stats()
+    start = time.perf_counter()
+    for qubit in qubits:
+        estimator = Estimator(System(*v0), sampler)
+        try:
+            value = getattr(estimator, method)(qubit, n)
+        except LogArgumentError:  # non-positive log argument in estimate_gamma2
+            value = None
+        shots += true_shots(protocol, n, estimator)
+        if value is None or not np.isfinite(value):
+            failures += 1
+        else:
+            errors.append(value - getattr(qubit, protocol))
+    wall_time = time.perf_counter() - start
+    calls = {k: v - before[k] for k, v in propagator.stats().items()}
+    lookups = cache.stats().values()
+
+    errors = np.array(errors)
+    abs_errors = np.abs(errors)
+    summary = lambda f: float(f()) if len(errors) else None
+    return {
+        "protocol": protocol,
+        "n": n,
+        "samples": len(qubits),
+        "wall_time": wall_time,
+        "time_per_qubit": wall_time / len(qubits),
+        "propagator_calls": calls["calls"],
+        "propagator_matrices": calls["matrices"],
+        "cache_hits": sum(c["hits"] for c in lookups),
+        "cache_misses": sum(c["misses"] for c in lookups),
+        "shots": shots,
+        "draws": sampler.shots,
+        "failures": failures,
+        "failure_rate": failures / len(qubits),
+        "bias": summary(errors.mean),
+        "mae": summary(abs_errors.mean),
+        "rmse": summary(lambda: np.sqrt(np.mean(errors ** 2))),
+        "median_abs_error": summary(lambda: np.median(abs_errors)),
+        "p90_abs_error": summary(lambda: np.percentile(abs_errors, 90)),
+        "p99_abs_error": summary(lambda: np.percentile(abs_errors, 99)),
+    }
+
+
+def run_benchmark(samples: int = 1000, shots=(1000, 10000, 100000), protocols=tuple(PROTOCOLS),
+                  seed: int = 0, version: str = None) -> list:
+    """Sweep every protocol over the shot counts on `samples` qubits drawn from the Qubit.random prior.
+
+    The same qubits are used for every (protocol, n) pair, and each pair gets
+    its own sampler stream, so rows are comparable across runs and versions.
+    """
+    version = version or version_label()
+    qubit_seed, *streams = np.random.SeedSequence(seed).spawn(1 + len(protocols) * len(shots))
+    rng = np.random.default_rng(qubit_seed)
+    qubits = [Qubit.random(rng) for _ in range(samples)]
+
+    rows = []
+    for protocol in protocols:
+        for n in shots:
+            row = run_protocol(protocol, qubits, n, streams.pop(0))
+            row["version"] = version
+            rows.append(row)
+    return rows
+
+
+def write_results(rows: list, path: str):
+    """Write benchmark rows as JSON (.json) or CSV (anything else)."""
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=2)
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def cheapest_n(rows: list, protocol: str, target: float, metric: str = "rmse"):
+    """Smallest shot count whose `metric` meets `target` for `protocol`, or None."""
+    passing = [row["n"] for row in rows if row["protocol"] == protocol
+               and row[metric] is not None and row[metric] <= target]
+    return min(passing, default=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy-vs-cost benchmark of the Estimator protocols")
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--shots", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--protocols", nargs="+", choices=list(PROTOCOLS), default=list(PROTOCOLS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--profile", metavar="PATH", help="also record counters and timers to this JSON file")
+    args = parser.parse_args()
+
+    if args.profile:
+        with instrument.session():
+            rows = run_benchmark(args.samples, args.shots, args.protocols, args.seed)
+        instrument.write(args.profile)
+        print(instrument.summary())
+    else:
+        rows = run_benchmark(args.samples, args.shots, args.protocols, args.seed)
+    write_results(rows, args.output)
+    for row in rows:
+        print(f"{row['protocol']:>7} n={row['n']:<8} time={row['time_per_qubit'] * 1e3:8.3f} ms/qubit "
+              f"fail={row['failure_rate']:6.1%} rmse={row['rmse']}")
@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import propagator
+
+
+class LRUCache:
+    """Bounded least-recently-used cache with hit/miss statistics.
+
+    Keys are tuples of floats quantized to multiples of `quantum`, so values
+    that differ only by round-off share an entry.
+    """
+
+    ENTRY_OVERHEAD = 256  # approximate bytes of key and bookkeeping per entry
+
+    # CONSTRUCTOR
+    def __init__(self, max_bytes: int = 32 * 2**20, quantum: float = 1e-12):
+        self.max_bytes = max_bytes
+        self.quantum = quantum
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()  # GUI estimations share the cache across threads
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        return (f"LRUCache(entries={len(self.entries)}, bytes={self.bytes}, "
+                f"hits={self.hits}, misses={self.misses})")
+
+    def key(self, tag, *values) -> tuple:
+        return (tag,) + tuple(round(float(v) / self.quantum) for v in values)
+
+    def get(self, key):
+        """Cached value for key, or None on a miss."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes: int = 0):
+        size = nbytes + self.ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self.bytes > self.max_bytes:
+            _, (_, size) = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def resize(self, max_bytes: int):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"entries": len(self.entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+# Propagators exp(G t) keyed on (omega, u, kappa, gamma1, gamma2, t), and
+# measurement probabilities keyed on those plus the initial state
+propagators = LRUCache(32 * 2**20)
+probabilities = LRUCache(8 * 2**20)
+enabled = True
+
+
+def configure(max_bytes: int = None, quantum: float = None, enable: bool = None):
+    """Set the memory cap (split 4:1 between the two caches), key resolution or on/off switch."""
+    global enabled
+    if max_bytes is not None:
+        propagators.resize(max_bytes * 4 // 5)
+        probabilities.resize(max_bytes // 5)
+    if quantum is not None:
+        propagators.quantum = probabilities.quantum = quantum
+        clear()
+    if enable is not None:
+        enabled = enable
+
+
+def clear():
+    propagators.clear()
+    probabilities.clear()
+
+
+def stats() -> dict:
+    return {"propagators": propagators.stats(), "probabilities": probabilities.stats()}
+
+
+def cached_propagator(params, t):
+    """propagator.propagator(params, t) for a single parameter tuple and time, memoized."""
+    if not enabled:
+        return propagator.propagator(params, t)
+    key = propagators.key("P", *params, t)
+    P = propagators.get(key)
+    if P is None:
+        P = propagator.propagator(params, t)
+        propagators.put(key, P, P.nbytes)
+    return P
+
+
+def cached_sequence(params, segments):
+    """Propagator through consecutive (u, duration) segments for (omega, kappa, gamma1, gamma2) = params.
+
+    Each segment's propagator comes from the cache, so a repeated pulse
+    sequence costs one 4x4 product per segment.
+    """
+    omega, kappa, gamma1, gamma2 = params
+    P = np.eye(4)
+    for u, d in segments:
+        P = cached_propagator([omega, u, kappa, gamma1, gamma2], d) @ P
+    return P
+
+
+def evolve(params, v0, t):
+    """Bloch vector at time t from v0, through the propagator cache."""
+    return propagator.apply(cached_propagator(params, t), v0)
+
+
+def probability(params, v0, t, measure) -> float:
+    """measure(v) for the state v evolved from v0, memoized on (measure, params, t, v0)."""
+    if not enabled:
+        return float(measure(evolve(params, v0, t)))
+    key = probabilities.key(measure.__name__, *params, t, *v0)
+    p = probabilities.get(key)
+    if p is None:
+        p = float(measure(evolve(params, v0, t)))
+        probabilities.put(key, p)
+    return p
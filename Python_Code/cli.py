@@ -0,0 +1,118 @@
+import argparse
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+
+import instrument
+from qubit import Qubit
+from system import System
+from estimator import Estimator
+from dataset import Dataset
+from fleet import METHODS, PARAMETERS, identify_fleet, load_qubits
+from store import ResultStore
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Identify qubit parameters headlessly, from parameter sets or recorded datasets")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--qubits", metavar="PATH", help="CSV (omega,kappa,gamma1,gamma2 header) or JSON qubit file")
+    source.add_argument("--random", type=int, metavar="N", help="draw N qubits from the Qubit.random prior (default 1)")
+    source.add_argument("--dataset", nargs="+", metavar="PATH", help="recorded datasets, fitted with the joint estimator")
+    parser.add_argument("--parameters", nargs="+", choices=PARAMETERS, default=list(PARAMETERS))
+    parser.add_argument("--method", choices=METHODS, default="elimination",
+                        help="elimination: the separate protocols; smc: particle filter for kappa and omega; "
+                             "joint: one maximum-likelihood fit of all four")
+    parser.add_argument("--shots", type=int, default=100000, help="shots per protocol (in total for joint)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--store", metavar="DIR",
+                        help="reuse and record results in this result store; with --seed, a rerun resumes "
+                             "an interrupted campaign")
+    parser.add_argument("--output", metavar="PATH", help="write results as JSON (.json) or CSV; default: stdout")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="record counters and timers to this JSON file (main process only; use --workers 1)")
+    return parser
+
+
+def identify_datasets(paths, parameters=PARAMETERS) -> list:
+    """Joint fit of every recorded dataset, with its ground truth when known."""
+    results = []
+    for index, path in enumerate(paths):
+        data = Dataset(path)
+        truth = data.qubit
+        start = time.perf_counter()
+        fit = Estimator(System(0, 0, -1)).estimate_joint(data=data)
+        result = {f"{name}_true": (float(getattr(truth, name)) if truth is not None else None)
+                  for name in PARAMETERS}
+        result["joint_seconds"] = time.perf_counter() - start
+        result.update((name, fit.value[name]) for name in parameters)
+        result.update((f"{name}_stderr", fit.stderr[name]) for name in parameters)
+        result["index"] = index
+        result["dataset"] = path
+        results.append(result)
+    return results
+
+
+def run(args) -> list:
+    if args.dataset:
+        return identify_datasets(args.dataset, args.parameters)
+    if args.qubits:
+        qubits = load_qubits(args.qubits)
+    else:
+        rng = np.random.default_rng(args.seed)
+        qubits = [Qubit.random(rng) for _ in range(args.random or 1)]
+    store = ResultStore(args.store) if args.store else None
+    results = identify_fleet(qubits, args.shots, args.workers, seed=args.seed,
+                             parameters=args.parameters, method=args.method, store=store)
+    if store is not None:
+        print(f"{store.hits} of {len(results)} results reused from {args.store}", file=sys.stderr)
+    return results
+
+
+def write_results(results: list, path: str = None):
+    """Write results as JSON (.json or stdout) or CSV (any other path)."""
+    if path is None or path.endswith(".json"):
+        text = json.dumps(results, indent=2)
+        if path is None:
+            print(text)
+        else:
+            with open(path, "w") as f:
+                f.write(text + "\n")
+        return
+    fields = list(dict.fromkeys(key for result in results for key in result))
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+# Options that only apply to simulated campaigns; recorded datasets are always jointly fitted
+SIMULATION_OPTIONS = ("method", "shots", "seed", "workers", "store")
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.dataset:
+        given = [f"--{name}" for name in SIMULATION_OPTIONS if getattr(args, name) != parser.get_default(name)]
+        if given:
+            parser.error(f"{', '.join(given)} not allowed with --dataset")
+    start = time.perf_counter()
+    if args.profile:
+        with instrument.session():
+            results = run(args)
+        instrument.write(args.profile)
+        print(instrument.summary(), file=sys.stderr)
+    else:
+        results = run(args)
+    write_results(results, args.output)
+    print(f"{len(results)} identifications in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
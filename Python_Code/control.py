@@ -1,9 +1,45 @@
 class Control : 
-    def __init__(self,u) : 
+    def __init__(self,u,segments=None) : 
         self.u = u
+        # Piecewise-constant schedule [(u, duration), ...]; None for a constant u.
+        # The drive is off (u = 0) after the last segment.
+        self.segments = segments
+
+    @classmethod
+    def sequence(cls, segments):
+        """Piecewise-constant drive from (amplitude, duration) segments."""
+        segments = [(float(u), float(d)) for u, d in segments]
+        if not segments or any(d < 0 for _, d in segments):
+            raise ValueError("a sequence needs at least one segment and non-negative durations")
+        return cls(segments[0][0], segments)
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        if self.segments is None:
+            return f"Control(u={self.u})"
+        return f"Control.sequence({self.segments})"
         
     def get_u(self) : 
         return self.u
     
     def set_u(self, u) : 
-        self.u = u
\ No newline at end of file
+        self.u = u
+        self.segments = None
+
+    def duration(self):
+        """Total duration of the schedule (0 for a constant drive)."""
+        return sum(d for _, d in self.segments) if self.segments is not None else 0.0
+
+    def until(self, t):
+        """(u, duration) segments covering [0, t], with the drive off past the schedule."""
+        if self.segments is None:
+            return [(self.u, t)]
+        covered = []
+        for u, d in self.segments:
+            if t <= 0:
+                break
+            covered.append((u, min(d, t)))
+            t -= d
+        if t > 0:
+            covered.append((0.0, t))
+        return covered
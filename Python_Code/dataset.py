@@ -0,0 +1,127 @@
+import json
+import os
+
+import numpy as np
+
+from qubit import Qubit
+import joint
+
+# Column-oriented on-disk shot-count tables.
+#
+# A dataset is a directory holding one raw little-endian file per column and
+# a meta.json with the row count, the basis names and the qubit ground truth
+# when it is known. Columns are read back with np.memmap, so opening a
+# dataset costs nothing and only the pages actually used are read. Chunks
+# are appended to the column files first and the row count in meta.json is
+# replaced atomically afterwards, so a reader never sees a partial chunk.
+
+COLUMNS = {
+    "prep_x": "<f8", "prep_y": "<f8", "prep_z": "<f8",  # initial Bloch vector
+    "basis": "<u1",                                     # index into meta["bases"]
+    "u": "<f8", "t": "<f8",
+    "shots": "<i8", "successes": "<i8",
+}
+VERSION = 1
+
+
+class Dataset:
+    # CONSTRUCTOR
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != VERSION:
+            raise ValueError(f"unsupported dataset version: {self.meta.get('version')}")
+
+    @classmethod
+    def create(cls, path: str, qubit: Qubit = None):
+        """New empty dataset at `path`, recording the qubit's parameters as ground truth if given."""
+        os.makedirs(path, exist_ok=False)
+        for name in COLUMNS:
+            open(os.path.join(path, name + ".bin"), "wb").close()
+        truth = dict(zip(joint.PARAMETERS, map(float, qubit.get_param()))) if qubit is not None else None
+        _write_meta(path, {"version": VERSION, "rows": 0, "columns": COLUMNS, "bases": [], "qubit": truth})
+        return cls(path)
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        return f"Dataset({self.path!r}, rows={len(self)}, bases={self.meta['bases']})"
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def qubit(self):
+        """Ground-truth Qubit, or None when unknown."""
+        truth = self.meta["qubit"]
+        return Qubit(**truth) if truth is not None else None
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memory map of one column."""
+        rows = len(self)
+        if rows == 0:
+            return np.empty(0, dtype=COLUMNS[name])
+        return np.memmap(os.path.join(self.path, name + ".bin"), dtype=COLUMNS[name], mode="r", shape=(rows,))
+
+    def append(self, settings: joint.Settings, shots, successes):
+        """Append one chunk of rows: the settings with their shots and 1 outcomes."""
+        bases = self.meta["bases"]
+        for name in settings.basis:
+            if name not in bases:
+                bases.append(name)
+        if len(bases) > 256:
+            raise ValueError("a dataset holds at most 256 bases")
+        n = len(settings)
+        chunk = {"prep_x": settings.v0[:, 0], "prep_y": settings.v0[:, 1], "prep_z": settings.v0[:, 2],
+                 "basis": [bases.index(b) for b in settings.basis], "u": settings.u, "t": settings.t,
+                 "shots": np.broadcast_to(shots, (n,)), "successes": np.broadcast_to(successes, (n,))}
+        for name, dtype in COLUMNS.items():
+            with open(os.path.join(self.path, name + ".bin"), "r+b") as f:
+                # Overwrite any bytes left by an interrupted append beyond the committed rows
+                f.seek(self.meta["rows"] * np.dtype(dtype).itemsize)
+                f.write(np.asarray(chunk[name]).astype(dtype).tobytes())
+                f.truncate()
+        self.meta["rows"] += n
+        _write_meta(self.path, self.meta)
+
+    def settings(self, rows=slice(None)) -> joint.Settings:
+        bases = np.array(self.meta["bases"], dtype=object)
+        v0 = np.column_stack([self.column("prep_x")[rows], self.column("prep_y")[rows],
+                              self.column("prep_z")[rows]])
+        return joint.Settings(v0, bases[self.column("basis")[rows]], self.column("u")[rows],
+                              self.column("t")[rows])
+
+    def arrays(self) -> tuple:
+        """(joint.Settings, shots, successes) with repeated settings merged, as taken by joint.fit."""
+        if len(self) == 0:
+            raise ValueError(f"dataset {self.path!r} is empty")
+        keys = np.column_stack([self.column(name) for name in ("prep_x", "prep_y", "prep_z", "basis", "u", "t")])
+        # Sort rows so that equal settings are adjacent, then sum each run
+        order = np.lexsort(keys.T[::-1])
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, np.any(keys[1:] != keys[:-1], axis=1)])
+        unique = keys[starts]
+        shots = np.add.reduceat(self.column("shots")[order], starts)
+        successes = np.add.reduceat(self.column("successes")[order], starts)
+        bases = np.array(self.meta["bases"], dtype=object)
+        settings = joint.Settings(unique[:, :3], bases[unique[:, 3].astype(int)], unique[:, 4], unique[:, 5])
+        return settings, shots, successes
+
+
+def _write_meta(path: str, meta: dict):
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+
+def record(path: str, qubit: Qubit, settings: joint.Settings = None, shots: int = 1000, repeats: int = 1,
+           sampler=None) -> Dataset:
+    """Simulate `repeats` chunks of `shots` shots per setting on the qubit and store them at `path`."""
+    settings = joint.schedule() if settings is None else settings
+    # An ensemble (QubitArray) has no single ground truth
+    truth = qubit if isinstance(qubit, Qubit) else None
+    data = Dataset(path) if os.path.exists(path) else Dataset.create(path, truth)
+    for _ in range(repeats):
+        data.append(settings, shots, joint.simulate(qubit, settings, shots, sampler))
+    return data
@@ -0,0 +1,104 @@
+import numpy as np
+
+from qubit import Qubit
+from joint import PARAMETERS, Settings, schedule
+
+# Fisher-information experiment design.
+#
+# One shot at a setting with outcome probability p carries the Fisher
+# information F = grad(p) grad(p)^T / (p (1 - p)) about (omega, kappa,
+# gamma1, gamma2). Both F and the gradient come from the exact propagator
+# (joint.Settings.gradient), for every setting of a candidate grid and every
+# parameter set drawn from the prior box at once. A schedule is a weighting
+# of the grid; the expected variance per shot of the parameters of interest
+# is averaged over the prior draws, so the design does not depend on the
+# unknown qubit.
+
+
+def prior_sample(prior=None, n: int = 32, rng=None) -> np.ndarray:
+    """n parameter sets (n, 4) drawn uniformly from the prior box (Qubit.RANGES by default)."""
+    rng = np.random.default_rng() if rng is None else rng
+    box = np.array([(prior or Qubit.RANGES)[name] for name in PARAMETERS], dtype=float)
+    return rng.uniform(box[:, 0], box[:, 1], (n, 4))
+
+
+def information(settings: Settings, theta) -> np.ndarray:
+    """Per-shot Fisher information (M, N, 4, 4) of every setting for parameter sets theta (M, 4)."""
+    p, dp = settings.gradient(np.atleast_2d(theta))
+    weight = 1 / np.clip(p * (1 - p), 1e-12, None)
+    return weight[..., None, None] * dp[..., :, None] * dp[..., None, :]
+
+
+def expected_variance(F, weights, parameters=PARAMETERS) -> float:
+    """Prior-averaged summed variance per shot of `parameters` for per-shot information F and grid weights."""
+    select = [PARAMETERS.index(name) for name in parameters]
+    M = np.einsum("n,mnij->mij", weights, F)
+    cov = np.linalg.pinv(M, hermitian=True)
+    return float(np.mean(np.trace(cov[:, select][:, :, select], axis1=1, axis2=2)))
+
+
+def grid(times=np.linspace(0.1, 5, 50), u=1000) -> Settings:
+    """Candidate settings: the three experiments of joint.schedule() over a finer time grid.
+
+    `u` may be an array of drive amplitudes: the driven experiment is then
+    repeated at each of them (on its own 1/u time scale), so that design()
+    chooses the control as well as the times.
+    """
+    times = np.asarray(times, dtype=float)
+    amplitudes = np.atleast_1d(np.asarray(u, dtype=float))
+    return Settings.concatenate(schedule(times, amplitudes[0]),
+                                *(Settings((0, 0, -1), "z", a, times / a) for a in amplitudes[1:]))
+
+
+def design(candidates: Settings = None, parameters=PARAMETERS, prior=None, n_prior: int = 32,
+           iterations: int = 500, threshold: float = 1e-3, coverage: float = 0.2, rng=None) -> Settings:
+    """Schedule over `candidates` minimising the expected variance per shot of `parameters`.
+
+    The weights are found with the multiplicative algorithm for A-optimal
+    designs (Silvey, Titterington and Torsney, 1978), with the information
+    matrix averaged over `n_prior` draws from the prior box. The weights are
+    returned as shot fractions, ready for Estimator.estimate_joint.
+
+    Fisher information is local: a design concentrated on a few times can
+    leave omega and kappa aliased. A `coverage` fraction of the shots is
+    therefore spread evenly over all candidates. Settings whose optimal
+    weight ends below `threshold` get only that coverage share; with
+    coverage=0 they are dropped from the schedule.
+    """
+    candidates = grid() if candidates is None else candidates
+    select = [PARAMETERS.index(name) for name in parameters]
+    F = information(candidates, prior_sample(prior, n_prior, rng))
+    # Regularizing ridge, so the information is invertible before the weights settle
+    ridge = 1e-9 * np.trace(F.mean(axis=(0, 1))) * np.eye(4)
+    W = np.zeros((4, 4))
+    W[select, select] = 1
+
+    weights = np.full(len(candidates), 1 / len(candidates))
+    for _ in range(iterations):
+        cov = np.linalg.inv(np.einsum("n,mnij->mij", weights, F) + ridge)
+        # -d(mean trace(W cov)) / d weight_n for every setting n
+        d = np.einsum("mij,mnji->n", cov @ W @ cov, F) / len(F)
+        weights = weights * d / (weights @ d)
+
+    weights = np.where(weights >= threshold, weights, 0)
+    weights = (1 - coverage) * weights / weights.sum() + coverage / len(candidates)
+    keep = weights > 0
+    chosen = candidates[keep]
+    return Settings(chosen.v0, chosen.basis, chosen.u, chosen.t, weights[keep])
+
+
+def best_time(v0, basis: str, u: float, times, parameter: str, multiples=(1,), prior=None,
+              n_prior: int = 256, rng=None) -> float:
+    """Time in `times` minimising the prior-averaged variance per shot of one parameter.
+
+    The other parameters are treated as known, as in the single-parameter
+    protocols. `multiples` measures at several multiples of the time with
+    equal shots, e.g. (1, 2) for estimate_gamma2's t and 2t.
+    """
+    times = np.asarray(times, dtype=float)
+    multiples = np.asarray(multiples, dtype=float)
+    i = PARAMETERS.index(parameter)
+    settings = Settings(v0, basis, u, np.outer(times, multiples).ravel())
+    F = information(settings, prior_sample(prior, n_prior, rng))[..., i, i]
+    F = F.reshape(len(F), len(times), len(multiples)).mean(axis=-1)
+    return float(times[np.argmin(np.mean(1 / np.clip(F, 1e-300, None), axis=0))])
@@ -1,97 +1,181 @@
-from utils import *
-from qubit import Qubit
+from utils import E1, EliminationAlgorithmKappa, EliminationAlgorithmOmega2, alias_candidates, gamma2_from, \
+    omega_candidates
+from qubit import Qubit, nominal
 from control import Control
 from system import System
-from observer import Observer
+from observer import Observer, ensemble_truth
+import instrument
+import joint
+import measurement
+import propagator
+import sampling
+import smc
 import numpy as np
-from scipy.linalg import expm
+
+# Estimator method and initial Bloch vector for each protocol
+PROTOCOLS = {
+    "gamma1": ("estimate_gamma1", (0, 0, -1)),
+    "kappa": ("estimate_kappa", (0, 0, -1)),
+    "gamma2": ("estimate_gamma2", (0, 1, 0)),
+    "omega": ("estimate_omega", (0, 1, 0)),
+}
+
+
+# Methods of estimate_kappa and estimate_omega
+METHODS = ("elimination", "smc")
+
+
+def _elimination_batch(method: str, options: dict):
+    # Validate the method; in elimination mode only `batch` (adaptive rounds) applies
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+    if method == "elimination":
+        options = dict(options)
+        batch = options.pop("batch", None)
+        if options:
+            raise ValueError(f"options not used by method='elimination': {', '.join(sorted(options))}")
+        return batch
+    return None
 
 
 class Estimator:
-    def __init__(self, system: System):
+    def __init__(self, system: System, sampler=None):
         self.system = system
+        self.sampler = sampler  # ShotSampler; None uses the process-wide default
+        self.last_elimination = None  # EliminationResult of the last kappa/omega run
+        self.last_posterior = None    # smc.Posterior of the last method="smc" run
+        self.last_fit = None          # joint.JointFit of the last estimate_joint run
     
-    def estimate_gamma1(self, qubit: Qubit, n):
+    @instrument.timed("estimator.gamma1")
+    def estimate_gamma1(self, qubit: Qubit, n, t: float = 2.0):
+        # t: measurement time, e.g. from design.best_time
         control = Control(u=0)
-        observer = Observer(E1)
-        t = 2.0
+        observer = Observer(E1, self.sampler)
         p = observer.measure(self.system, qubit, control, t, n)
         gamma1 = -np.log(p) / t
         return gamma1
     
-    def estimate_kappa(self, qubit:Qubit, n) : 
+    @instrument.timed("estimator.kappa")
+    def estimate_kappa(self, qubit:Qubit, n, progress=None, method="elimination", **options) : 
         control = Control(u=1000)
-        observer = Observer(E1)
+        batch = _elimination_batch(method, options)
+        if method == "smc":
+            # Rotation angle u kappa t explored up to 5 rad
+            times = np.linspace(0.1, 5, 50) / control.get_u()
+            return self._estimate_smc("kappa", qubit, control, "z", times, n, progress, **options)
+
+        observer = Observer(E1, self.sampler)
         t = 1/control.get_u()
         p = observer.measure(self.system, qubit, control, t, n)
         
         theta = np.arccos(2 * p - 1)
-        KAPPA = np.array([val for k in range(-5, 5) for val in [theta + k * np.pi, -theta + k * np.pi] if val > 0])
+        KAPPA = alias_candidates(theta, range(-5, 5))
 
         # Full parameters list to pass to simulation: omega, u, kappa, gamma1, gamma2
-        omega, kappa, gamma1, gamma2 = qubit.get_param()
+        omega, kappa, gamma1, gamma2 = nominal(qubit).get_param()
         params = [omega, control.get_u(), kappa, gamma1, gamma2]
 
         # Initial state vector
         v0 = self.system.get_coordinates()
+        truth = ensemble_truth(qubit, control, "z", self.system)
 
-    # Call elimination algorithm
-        return EliminationAlgorithmKappa(KAPPA, n, t, params, v0)
+        # Call elimination algorithm; None if no candidate survived
+        self.last_elimination = EliminationAlgorithmKappa(KAPPA, n, t, params, v0, progress, self.sampler, batch,
+                                                          truth)
+        return self.last_elimination.value
     
-    def estimate_gamma2(self, qubit: Qubit, n: int):
+    @instrument.timed("estimator.gamma2")
+    def estimate_gamma2(self, qubit: Qubit, n: int, t: float = 1.0):
         control = Control(u=0)
-        observer = Observer(E1)
+        observer = Observer(E1, self.sampler)
         v_init = self.system.get_coordinates()  # Y-axis state
-        qubit_params = qubit.get_param()
+        qubit_params = nominal(qubit).get_param()
         
-        t = 1.0
         # Simulate measurements at t and 2t
         s1 = self._simulate_rotated(qubit,control,t,n)
         self.system.initialize()
         s2 = self._simulate_rotated(qubit,control, 2*t,n)
 
-        ln_argument = 2 * s2 - 1 + 2 * (1 - 2 * s1) ** 2
-        if ln_argument <= 0:
-            raise ValueError(f"log argument non-positive: {ln_argument:.5f}")
-        
-        ln_term = -np.log(ln_argument) / (4 * t)
-        gamma2 = ln_term - 0.25 * qubit_params[2]  # subtract gamma1/4
-        return gamma2
+        return gamma2_from(s1, s2, t, qubit_params[2])
         
-    def estimate_omega(self, qubit: Qubit, n: int):
+    @instrument.timed("estimator.omega")
+    def estimate_omega(self, qubit: Qubit, n: int, progress=None, method="elimination", **options):
         control = Control(u=0)
-        observer = Observer(E1)
-        omega, kappa, gamma1, gamma2 = qubit.get_param()
+        batch = _elimination_batch(method, options)
+        if method == "smc":
+            times = np.linspace(0.1, 5, 50)
+            return self._estimate_smc("omega", qubit, control, "x_rot", times, n, progress, **options)
+
+        observer = Observer(E1, self.sampler)
+        omega, kappa, gamma1, gamma2 = nominal(qubit).get_param()
         params = [omega, control.get_u(), kappa, gamma1, gamma2]
         v0 = self.system.get_coordinates()
+        truth = ensemble_truth(qubit, control, "x_rot", self.system)
         
         t = 1.0
 
         s1 = self._simulate_rotated(qubit,control,t, n)
-        gamma = 0.5 * params[3] + 2 * params[4]
-
-        theta = np.arccos((1 - 2 * s1) * np.exp(gamma * t))
-        OMEGA = np.array([
-            val / t
-            for k in range(-30, 30)
-            for val in [theta + k * np.pi, -theta + k * np.pi]
-            if val > 0
-        ])
+        OMEGA = omega_candidates(s1, t, gamma1, gamma2)
         
 
-        return EliminationAlgorithmOmega2(OMEGA, n, t, params, v0)   
+        self.last_elimination = EliminationAlgorithmOmega2(OMEGA, n, t, params, v0, progress, self.sampler, batch,
+                                                           truth)
+        return self.last_elimination.value
         
         
             
+    @instrument.timed("estimator.joint")
+    def estimate_joint(self, qubit: Qubit = None, n: int = None, settings=None, data=None, **options):
+        """Fit (omega, kappa, gamma1, gamma2) together from one shared dataset of n shots in total.
+
+        The shots are split over `settings` (joint.schedule() by default) in
+        proportion to their weights, so a schedule from design.design() can
+        be passed directly. The settings' preparations replace the
+        estimator's system, and nothing is read from the qubit except to
+        simulate the measurements. With `data` (a dataset.Dataset or
+        stream.Counts) the recorded counts are fitted instead, and qubit and
+        n are not needed. Returns the joint.JointFit, also kept in last_fit.
+        """
+        if data is not None:
+            settings, shots, successes = data.arrays()
+        else:
+            settings = joint.schedule() if settings is None else settings
+            shots = settings.allocate(n)
+            successes = joint.simulate(qubit, settings, shots, self.sampler)
+        self.last_fit = joint.fit(settings, shots, successes, **options)
+        return self.last_fit
+
     def _simulate_rotated(self,qubit,control,t,n):
-        self.system.evolve(qubit,control,t)
-        v = self.system.get_coordinates()
+        # Measure |1⟩ after the exp(iπ/4 σx) rotation, from the precomputed basis table
+        return Observer("x_rot", self.sampler).measure(self.system, qubit, control, t, n)
 
-        theta = np.pi / 4
-        UX = expm(1j * theta * sx)
-        rho = 0.5 * (np.eye(2) + v[0]*sx + v[1]*sy + v[2]*sz)
-        rho_rot = UX.conj().T @ rho @ UX
+    def _estimate_smc(self, name, qubit, control, basis, times, n, progress=None, steps=20, prior=None,
+                      **options):
+        """Particle-filter estimate of one parameter, spending n shots over `steps` adaptive steps.
 
-        p = np.real(np.trace(E1 @ rho_rot))
-        return np.sum(np.random.binomial(1, p, size=n)) / n
-    
+        The other parameters are taken from the qubit (the mean of a
+        QubitArray), as in the elimination protocols. Returns the posterior
+        mean; the full posterior, with its credible interval, is kept in
+        last_posterior.
+        """
+        sampler = sampling.resolve(self.sampler)
+        omega, kappa, gamma1, gamma2 = nominal(qubit).get_param()
+        params = np.array([omega, control.get_u(), kappa, gamma1, gamma2])
+        index = {"omega": 0, "kappa": 2}[name]
+        v0 = self.system.get_coordinates()
+        table = measurement.Table([basis])
+
+        def model(values, t):
+            rows = np.broadcast_to(params, (len(values), len(t), 5)).copy()
+            rows[..., index] = values[:, None]
+            return table.probabilities(propagator.evolve(rows, v0, t))[..., 0]
+
+        def measure(t, shots):
+            p = Observer(basis).probabilities(System.copy(self.system), qubit, control, t)
+            instrument.count("shots.measured", int(np.sum(shots)))
+            return sampler.counts(p, shots)
+
+        low, high = prior or Qubit.RANGES[name]
+        self.last_posterior = smc.estimate(model, measure, low, high, times, max(1, int(n) // steps), steps,
+                                           rng=sampler.rng, progress=progress, **options)
+        return self.last_posterior.mean
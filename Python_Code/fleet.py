@@ -0,0 +1,125 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from qubit import Qubit
+from system import System
+from estimator import Estimator, METHODS as ESTIMATOR_METHODS, PROTOCOLS
+from sampling import ShotSampler
+from store import ResultStore
+from utils import LogArgumentError
+
+PARAMETERS = ("gamma1", "kappa", "gamma2", "omega")
+METHODS = ESTIMATOR_METHODS + ("joint",)
+
+
+def _check_method(method: str):
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}, expected one of {METHODS}")
+
+
+def identify(qubit: Qubit, n: int = 100000, sampler=None, parameters=PARAMETERS,
+             method: str = "elimination") -> dict:
+    """Run the protocols for `parameters` on one qubit.
+
+    Every protocol gets a freshly prepared System, so no initialize() calls
+    are needed between them. An estimate that failed on shot noise (the
+    gamma2 log argument) is reported as None; any other error propagates. With
+    method="smc", kappa and omega use the particle filter; with
+    method="joint", all four come from one joint fit spending n shots.
+    Wall times are reported as <protocol>_seconds.
+    """
+    _check_method(method)
+    result = {f"{name}_true": float(getattr(qubit, name)) for name in PARAMETERS}
+
+    if method == "joint":
+        start = time.perf_counter()
+        fit = Estimator(System(0, 0, -1), sampler).estimate_joint(qubit, n)
+        result["joint_seconds"] = time.perf_counter() - start
+        result.update((name, fit.value[name]) for name in parameters)
+        return result
+
+    # gamma1 and kappa start from |1⟩, gamma2 and omega from |i⟩
+    for name in (p for p in PARAMETERS if p in parameters):
+        attribute, v0 = PROTOCOLS[name]
+        options = {"method": method} if name in ("kappa", "omega") else {}
+        start = time.perf_counter()
+        try:
+            value = getattr(Estimator(System(*v0), sampler), attribute)(qubit, n, **options)
+        except LogArgumentError:
+            value = None
+        result[f"{name}_seconds"] = time.perf_counter() - start
+        result[name] = float(value) if value is not None else None
+    return result
+
+
+def job_inputs(params, n: int, seed_seq, parameters, method: str) -> dict:
+    """Everything that determines the result of one identification, as hashed by the result store."""
+    return {"job": "identify", "qubit": [float(x) for x in params], "n": int(n), "seed": seed_seq,
+            "parameters": list(parameters), "method": method}
+
+
+def _identify_job(job):
+    index, params, n, seed_seq, parameters, method, store = job
+    result = identify(Qubit(*params), n, ShotSampler(seed_seq), parameters, method)
+    # Written by the worker as soon as it is done, so a crash loses only running jobs
+    if store is not None:
+        store.put(job_inputs(params, n, seed_seq, parameters, method), result)
+    return dict(result, index=index)
+
+
+def identify_fleet(qubits, n: int = 100000, workers: int = None, chunksize: int = None,
+                   seed=None, parameters=PARAMETERS, method: str = "elimination",
+                   store: ResultStore = None) -> list:
+    """Identify every qubit in `qubits` on a process pool.
+
+    Each qubit gets its own RNG stream spawned from `seed`, so results do not
+    depend on the number of workers or on the scheduling. Results come back
+    in input order.
+
+    With a ResultStore, jobs whose result is already stored are not run
+    again, and each new result is stored as soon as its job finishes. With a
+    fixed seed, rerunning an interrupted campaign therefore resumes it.
+    """
+    _check_method(method)
+    params = [q.get_param() if isinstance(q, Qubit) else list(q) for q in qubits]
+    streams = np.random.SeedSequence(seed).spawn(len(params))
+    jobs = [(i, p, n, s, tuple(parameters), method, store) for i, (p, s) in enumerate(zip(params, streams))]
+
+    results = [None] * len(jobs)
+    if store is not None:
+        for job in jobs:
+            stored = store.get(job_inputs(*job[1:6]))
+            if stored is not None:
+                results[job[0]] = dict(stored, index=job[0])
+        jobs = [job for job in jobs if results[job[0]] is None]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        done = [_identify_job(job) for job in jobs]
+    else:
+        # A few chunks per worker balances load without paying IPC per qubit
+        if chunksize is None:
+            chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(_identify_job, jobs, chunksize=chunksize))
+    for result in done:
+        results[result["index"]] = result
+    return results
+
+
+def load_qubits(path: str) -> list:
+    """Read qubit parameter sets from a CSV (header omega,kappa,gamma1,gamma2) or JSON file."""
+    if path.endswith(".json"):
+        with open(path) as f:
+            rows = json.load(f)
+        return [Qubit(**row) if isinstance(row, dict) else Qubit(*row) for row in rows]
+
+    with open(path, newline="") as f:
+        return [Qubit(float(row["omega"]), float(row["kappa"]),
+                      float(row["gamma1"]), float(row["gamma2"]))
+                for row in csv.DictReader(f)]
@@ -9,12 +9,12 @@ from PyQt5.QtWidgets import QVBoxLayout, QWidget
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 from PyQt5.QtCore import QUrl
 
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QTimer, QObject, QRunnable, QSettings, QThreadPool, pyqtSignal
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import qutip as qt
 from PyQt5.QtCore import Qt
 import random
+import time
 
 #===  pdf  =====
 import os
@@ -25,22 +25,31 @@ import webbrowser
 from system import System
 from qubit import Qubit
 from control import Control
-from estimator import Estimator
-from utils import BlochStates
+from estimator import Estimator, PROTOCOLS
+from sampling import ShotSampler
+from store import ResultStore, default_path
+from utils import BlochStates, EliminationResult
+import instrument
 
 
 
 # === Bloch sphere canvas class ===
 class BlochSphereCanvas(FigureCanvas):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, max_points=2000):
         fig = Figure()
         self.ax = fig.add_subplot(111, projection='3d')
         super().__init__(fig)
         self.setParent(parent)
+        self.max_points = max_points  # trajectory points kept on screen
+        self.background = None
+        self.reset_trajectory()
         self._init_sphere()
-        self.trajectory = []
+        # Every full redraw (first show, resize, rotation) re-caches the sphere
+        self.mpl_connect('draw_event', self._on_draw)
 
     def _init_sphere(self):
+        import qutip as qt  # loaded with the first canvas, not at module import
+
         self.ax.clear()
         b = qt.Bloch(fig=self.figure, axes=self.ax)
 
@@ -49,21 +58,174 @@ class BlochSphereCanvas(FigureCanvas):
         b.add_annotation([0, 1, 0], r'|i⟩')
         b.add_annotation([0, 0, 1], r'Z')
         b.render()
-    
-        
+
+        # Animated artists are left out of full redraws and blitted per frame
+        animated = self.supports_blit
+        self.trajectory_line, = self.ax.plot3D([], [], [], color='red', linewidth=1, animated=animated)
+        self.vector_line, = self.ax.plot3D([0, 0], [0, 0], [0, 0], color='blue', linewidth=2,
+                                           marker='o', markevery=[1], animated=animated)
         self.draw()
 
+    def _on_draw(self, event):
+        if self.supports_blit:
+            self.background = self.copy_from_bbox(self.figure.bbox)
+            self._draw_artists()
+
+    def _draw_artists(self):
+        self.ax.draw_artist(self.trajectory_line)
+        self.ax.draw_artist(self.vector_line)
+
+    def _append(self, vec):
+        # Keep every stride-th point; past the budget, drop every other
+        # point and double the stride, so the line stays a uniform sample
+        if self.n_frames % self.stride == 0:
+            self.trajectory.append(vec)
+            if len(self.trajectory) > self.max_points:
+                self.trajectory = self.trajectory[::2]
+                self.stride *= 2
+        self.n_frames += 1
+
+    def _refresh(self, vec):
+        traj = np.array(self.trajectory + [vec])
+        self.trajectory_line.set_data_3d(traj[:, 1], -traj[:, 0], traj[:, 2])
+        self.vector_line.set_data_3d([0, vec[1]], [0, -vec[0]], [0, vec[2]])
+
+        if self.background is None:
+            self.draw_idle()
+            return
+        self.restore_region(self.background)
+        self._draw_artists()
+        self.blit(self.figure.bbox)
+
     def update_vector(self, vec):
-        self._init_sphere()
-        self.trajectory.append(vec)
-        if len(self.trajectory) > 1:
-            traj = np.array(self.trajectory)
-            self.ax.plot3D(traj[:, 1], -traj[:, 0], traj[:, 2], color='red', linewidth=1)
-        self.ax.quiver(0, 0, 0, vec[1],-vec[0],vec[2], color='blue', linewidth=2)
-        self.draw()
+        vec = list(vec)
+        self._append(vec)
+        self._refresh(vec)
+
+    def extend_trajectory(self, frames):
+        """Show the last of `frames`, keeping all of them in the trajectory."""
+        for vec in frames:
+            self._append(list(vec))
+        self._refresh(list(frames[-1]))
 
     def reset_trajectory(self):
-        self.trajectory = []
+        self.trajectory = []  # down-sampled points, one every `stride` frames
+        self.stride = 1
+        self.n_frames = 0
+
+
+# === Playback of a precomputed trajectory ===
+class TrajectoryPlayback:
+    def __init__(self, canvas, frames, dt=0.01, interval=10):
+        # frames[k] is the Bloch vector at time (k + 1) * dt
+        self.canvas = canvas
+        self.frames = frames
+        self.dt = dt
+        self.index = 0
+        self.canvas.reset_trajectory()
+        self.start_time = time.perf_counter()
+        self.timer = QTimer()
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.step)
+        self.timer.start()
+
+    @staticmethod
+    def compute(system, qubit, control, t_final, dt=0.01):
+        """Frames on the dt grid of (0, t_final] from one batched evolution.
+
+        The system is left in its final state, as stepping through it would.
+        """
+        times = dt * np.arange(1, max(1, int(np.ceil(t_final / dt - 1e-9))) + 1)
+        frames = system.trajectory(qubit, control, times)
+        system.evolve(qubit, control, float(times[-1]))
+        return frames
+
+    def step(self):
+        # Frame due at the current wall-clock time; frames missed by a slow
+        # redraw are folded into the trajectory instead of delaying playback
+        due = min(len(self.frames), int((time.perf_counter() - self.start_time) / self.dt) + 1)
+        if due > self.index:
+            self.canvas.extend_trajectory(self.frames[self.index:due])
+            self.index = due
+        if self.index >= len(self.frames):
+            self.timer.stop()
+
+    def stop(self):
+        self.timer.stop()
+
+
+# === Background estimation ===
+SYMBOLS = {"omega": "ω", "kappa": "κ", "gamma1": "γ₁", "gamma2": "γ₂"}
+
+
+class EstimationCancelled(Exception):
+    pass
+
+
+class EstimationSignals(QObject):
+    progress = pyqtSignal(str, int, object)    # parameter, round, remaining candidates
+    finished = pyqtSignal(str, object, object)  # parameter, estimate, estimator
+    failed = pyqtSignal(str, str)               # parameter, reason
+
+
+class EstimationWorker(QRunnable):
+    """Runs one Estimator protocol on a QThreadPool thread."""
+
+    def __init__(self, parameter, qubit, n, sampler, store=None, inputs=None):
+        super().__init__()
+        self.parameter = parameter
+        self.qubit = qubit
+        self.n = n
+        self.sampler = sampler
+        self.store = store    # ResultStore consulted before, and filled after, the estimation
+        self.inputs = inputs  # job inputs keying the result in the store
+        self.cancelled = False
+        self.signals = EstimationSignals()
+
+    def cancel(self):
+        # Takes effect before the run starts or at the next elimination round
+        self.cancelled = True
+
+    def _progress(self, rounds, candidates):
+        if self.cancelled:
+            raise EstimationCancelled()
+        self.signals.progress.emit(self.parameter, rounds, list(candidates))
+
+    def run(self):
+        # Every outcome ends in finished or failed, so the UI never waits on a lost error
+        try:
+            self._run()
+        except EstimationCancelled:
+            self.signals.failed.emit(self.parameter, "cancelled")
+        except ValueError as error:
+            self.signals.failed.emit(self.parameter, str(error))
+        except Exception as error:
+            self.signals.failed.emit(self.parameter, repr(error))
+
+    def _run(self):
+        method, v0 = PROTOCOLS[self.parameter]
+        estimator = Estimator(System(*v0), self.sampler)
+        stored = self.store.get(self.inputs) if self.store is not None else None
+        if stored is not None:
+            if stored["elimination"] is not None:
+                estimator.last_elimination = EliminationResult(**stored["elimination"])
+            self.signals.finished.emit(self.parameter, stored["value"], estimator)
+            return
+        if self.cancelled:
+            raise EstimationCancelled()
+        if self.parameter in ("kappa", "omega"):
+            value = getattr(estimator, method)(self.qubit, self.n, progress=self._progress)
+        else:
+            value = getattr(estimator, method)(self.qubit, self.n)
+        if self.store is not None:
+            result = estimator.last_elimination
+            elimination = None if result is None else {
+                "value": result.value, "candidates": [float(c) for c in result.candidates],
+                "rounds": result.rounds, "reason": result.reason, "shots": int(result.shots)}
+            self.store.put(self.inputs, {"value": None if value is None else float(value),
+                                         "elimination": elimination})
+        self.signals.finished.emit(self.parameter, value, estimator)
+
 
 # === Main GUI class ===
 class QubitInterface(QMainWindow):
@@ -85,7 +247,26 @@ class QubitInterface(QMainWindow):
         self.system = None
         self.control = None
         self.estimator = None
-        self.t = 0.0
+        self.timer = None
+        self.timer_estimation = None
+        self.pool = QThreadPool.globalInstance()
+        # Estimates draw from streams of one seed kept in the Qt settings, so
+        # repeating an estimate on the same qubit, in this session or a later
+        # one, is answered from the result store
+        self.seed = self.load_seed()
+        self.store = ResultStore(default_path())
+        self.workers = {}  # parameter -> running EstimationWorker
+        self.status = {}   # parameter -> status line shown in the label
+
+    @staticmethod
+    def load_seed() -> np.random.SeedSequence:
+        # Drawn once and persisted; the entropy exceeds 64 bits, so it is kept as text
+        settings = QSettings("qubit_identification", "gui")
+        entropy = settings.value("seed")
+        if entropy is None:
+            entropy = str(np.random.SeedSequence().entropy)
+            settings.setValue("seed", entropy)
+        return np.random.SeedSequence(int(entropy))
 
     # === Pages will be implemented in detail next ===
     
@@ -250,25 +431,12 @@ class QubitInterface(QMainWindow):
         self.control = Control(u)
         self.estimator = Estimator(self.system)
         
-        # 3. Initialisation du timer de simulation
+        # 3. Calcul de la trajectoire complète, puis lecture
         self.sim_duration = t_final
-        self.t = 0.0
-        self.canvas_result.reset_trajectory()  # canvas de la page 3
-        self.timer = QTimer()
-        self.timer.setInterval(10)
-        self.timer.timeout.connect(self.step_simulation)
-        self.timer.start()
-    
-    def step_simulation(self):
-        dt = 0.01
-        self.t += dt
-
-        self.system.evolve(self.qubit, self.control, dt)
-        x, y, z = self.system.get_coordinates() 
-        self.canvas_result.update_vector([x, y, z])
-
-        if self.t >= self.sim_duration:
+        if self.timer is not None:
             self.timer.stop()
+        frames = TrajectoryPlayback.compute(self.system, self.qubit, self.control, t_final)
+        self.timer = TrajectoryPlayback(self.canvas_result, frames)  # canvas de la page 3
                     
     
 # ------------------ page 4 -------------------------------------------    
@@ -314,54 +482,119 @@ class QubitInterface(QMainWindow):
         reset_btn.clicked.connect(self.estimate_gamma2)
         button_layout.addWidget(reset_btn)
         
+        reset_btn = QPushButton("Estimate all")
+        reset_btn.clicked.connect(self.estimate_all)
+        button_layout.addWidget(reset_btn)
+        
+        reset_btn = QPushButton("Cancel")
+        reset_btn.clicked.connect(self.cancel_estimations)
+        button_layout.addWidget(reset_btn)
+
+        profile_btn = QPushButton("Profile")
+        profile_btn.setCheckable(True)
+        profile_btn.toggled.connect(self.toggle_profiling)
+        button_layout.addWidget(profile_btn)
+        
 
         layout.addLayout(button_layout)
         
         self.label = QLabel("Résultat de l’estimation apparaîtra ici")
         layout.addWidget(self.label)
 
+        # Counters and timers of the estimations, while profiling is on
+        self.profile_label = QLabel()
+        self.profile_label.setStyleSheet("font-family: monospace")
+        layout.addWidget(self.profile_label)
+
         self.estimate_page.setLayout(layout)
         self.stack.addWidget(self.estimate_page)
         
         
     def estimate_gamma1(self):
-        S = System(0, 0, -1)
-        E = Estimator(S)
-        gamma1_est = E.estimate_gamma1(self.qubit, n=100000)
-        true_val = self.qubit.get_gamma1()
-        self.label.setText(f"γ₁: true={true_val:.4f}, estimated={gamma1_est:.4f}")
-        self.animate_trajectory(S, self.qubit, self.control, t_final=self.time_input.value())
-        
+        self.start_estimation("gamma1")
 
     def estimate_gamma2(self):
-        S = System(0, 1, 0)
-        E = Estimator(S)
-        gamma2_est = E.estimate_gamma2(self.qubit, n=100000)
-        true_val = self.qubit.get_gamma2()
-        self.label.setText(f"γ₂: true={true_val:.4f}, estimated={gamma2_est:.4f}")
-        self.animate_trajectory(S, self.qubit, self.control, t_final=self.time_input.value())
-        
+        self.start_estimation("gamma2")
 
     def estimate_kappa(self):
-        S = System(0, 0, -1)
-        S.initialize()  # Nécessaire pour lancer le protocole
-        E = Estimator(S)
-        kappa_est = E.estimate_kappa(self.qubit, n=100000)
-        true_val = self.qubit.get_kappa()
-        self.label.setText(f"κ: true={true_val:.4f}, estimated={kappa_est:.4f}")
-        self.animate_trajectory(S, self.qubit, self.control, t_final=self.time_input.value())
-        
+        self.start_estimation("kappa")
 
     def estimate_omega(self):
-        S = System(0, 1, 0)
-        S.initialize()
-        E = Estimator(S)
-        omega_est = E.estimate_omega(self.qubit, n=100000)
-        true_val = self.qubit.get_omega()
-        self.label.setText(f"ω: true={true_val:.4f}, estimated={omega_est:.4f}")
-        self.animate_trajectory(S, self.qubit, self.control, t_final=self.time_input.value())
-        
-        
+        self.start_estimation("omega")
+
+    def estimate_all(self):
+        for parameter in ("omega", "kappa", "gamma1", "gamma2"):
+            self.start_estimation(parameter)
+
+    def start_estimation(self, parameter, n=100000):
+        # A new request for the same parameter replaces the running one
+        if parameter in self.workers:
+            self.workers[parameter].cancel()
+        seed = np.random.SeedSequence(self.seed.entropy, spawn_key=(list(PROTOCOLS).index(parameter),))
+        inputs = {"job": "estimate", "parameter": parameter, "qubit": self.qubit.get_param(), "n": n,
+                  "seed": seed}
+        worker = EstimationWorker(parameter, self.qubit, n, ShotSampler(seed), self.store, inputs)
+        worker.signals.progress.connect(self.on_estimation_progress)
+        worker.signals.finished.connect(self.on_estimation_finished)
+        worker.signals.failed.connect(self.on_estimation_failed)
+        self.workers[parameter] = worker
+        self.set_status(parameter, "running…")
+        self.pool.start(worker)
+
+    def cancel_estimations(self):
+        for worker in self.workers.values():
+            worker.cancel()
+
+    def _is_current(self, parameter):
+        # Signals from a worker that has since been replaced are ignored
+        worker = self.workers.get(parameter)
+        return worker is not None and worker.signals is self.sender()
+
+    def _release(self, parameter):
+        if not self._is_current(parameter):
+            return False
+        del self.workers[parameter]
+        return True
+
+    def on_estimation_progress(self, parameter, rounds, candidates):
+        if not self._is_current(parameter):
+            return
+        preview = ", ".join(f"{c:.4f}" for c in candidates[:4]) + (", …" if len(candidates) > 4 else "")
+        self.set_status(parameter, f"round {rounds}, {len(candidates)} candidates left [{preview}]")
+
+    def on_estimation_finished(self, parameter, value, estimator):
+        if not self._release(parameter):
+            return
+        true_val = getattr(self.qubit, parameter)
+        if parameter in ("kappa", "omega"):
+            text = self.format_elimination(value, estimator.last_elimination)
+        else:
+            text = f"estimated={value:.4f}"
+        self.set_status(parameter, f"true={true_val:.4f}, {text}")
+        if instrument.enabled:
+            self.profile_label.setText(instrument.summary())
+        self.animate_trajectory(estimator.system, self.qubit, self.control, t_final=self.time_input.value())
+
+    def on_estimation_failed(self, parameter, reason):
+        if self._release(parameter):
+            self.set_status(parameter, f"failed ({reason})")
+
+    def toggle_profiling(self, on):
+        if on:
+            instrument.reset()
+            self.profile_label.setText("profiling…")
+        instrument.enable(on)
+
+    def set_status(self, parameter, text):
+        self.status[parameter] = f"{SYMBOLS[parameter]}: {text}"
+        self.label.setText("\n".join(self.status[p] for p in SYMBOLS if p in self.status))
+
+    @staticmethod
+    def format_elimination(value, result):
+        if value is None:
+            return (f"estimation failed ({result.reason} after {result.rounds} rounds, "
+                    f"{len(result.candidates)} candidates left)")
+        return f"estimated={value:.4f} ({result.rounds} rounds)"
     
     def animate_trajectory(self, system, qubit, control, t_final):
         if self.stack.currentWidget() == self.estimate_page:
@@ -369,30 +602,11 @@ class QubitInterface(QMainWindow):
         else:
             canvas = self.canvas_result
         
-        canvas.reset_trajectory()
-        self.t = 0.0
         self.sim_duration = t_final
-        self.temp_system = system
-        self.temp_qubit = qubit
-        self.temp_control = control
-        self.temp_canvas = canvas
-
-        self.timer_estimation = QTimer()
-        self.timer_estimation.setInterval(10)
-        self.timer_estimation.timeout.connect(self.step_estimation_animation)
-        self.timer_estimation.start()
-    
-    
-    def step_estimation_animation(self):
-        dt = 0.01
-        self.t += dt
-
-        self.temp_system.evolve(self.temp_qubit, self.temp_control, dt)
-        x, y, z = self.temp_system.get_coordinates()
-        self.temp_canvas.update_vector([x, y, z])
-
-        if self.t >= self.sim_duration:
+        if self.timer_estimation is not None:
             self.timer_estimation.stop()
+        frames = TrajectoryPlayback.compute(system, qubit, control, t_final)
+        self.timer_estimation = TrajectoryPlayback(canvas, frames)
         
         
     
@@ -0,0 +1,44 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Headless estimation core, as imported by CLI runs and process-pool workers
+CORE_MODULES = ("instrument", "qubit", "control", "propagator", "sampling", "utils",
+                "system", "observer", "estimator", "store", "fleet", "cli")
+
+# Must only be loaded on first use (plotting, GUI, scipy-only helpers)
+DEFERRED_MODULES = ("matplotlib", "PyQt5", "qutip", "scipy")
+
+# Cold-start budget for importing the whole core in a fresh interpreter, in
+# seconds; numpy alone accounts for most of it
+IMPORT_BUDGET = 0.5
+
+
+def measure(modules=CORE_MODULES, repeat: int = 3):
+    """Best-of-`repeat` cold import time of `modules`, and the deferred modules it pulled in."""
+    code = ("import sys, time\n"
+            "start = time.perf_counter()\n"
+            f"import {', '.join(modules)}\n"
+            "print(time.perf_counter() - start)\n"
+            f"print(' '.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))\n")
+    here = os.path.dirname(os.path.abspath(__file__))
+    best, loaded = float("inf"), []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True,
+                             text=True, check=True).stdout.splitlines()
+        best = min(best, float(out[0]))
+        loaded = out[1].split() if len(out) > 1 else []
+    return best, loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the cold-start import time of the estimation core")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET)
+    args = parser.parse_args()
+
+    elapsed, loaded = measure()
+    print(f"core import: {elapsed * 1e3:.1f} ms (budget {args.budget * 1e3:.0f} ms)")
+    if loaded:
+        print(f"deferred modules imported eagerly: {', '.join(loaded)}")
+    sys.exit(0 if elapsed <= args.budget and not loaded else 1)
@@ -0,0 +1,151 @@
+import functools
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Opt-in counters and timers for the estimation hot paths.
+#
+# Disabled by default: every hook is then a single test of the module-level
+# `enabled` flag. When enabled, counters, value statistics and per-stage wall
+# times are accumulated per process and exported by profile() together with
+# the propagator and cache statistics.
+
+enabled = False
+
+_lock = threading.Lock()  # GUI estimations record from worker threads
+_counters = defaultdict(int)
+_values = {}                   # name -> [count, sum, min, max]
+_timers = defaultdict(lambda: [0, 0.0])  # name -> [calls, seconds]
+
+
+def enable(on: bool = True):
+    global enabled
+    enabled = on
+
+
+def disable():
+    enable(False)
+
+
+def reset():
+    """Clear every counter, value and timer, and the propagator call statistics."""
+    import propagator
+
+    with _lock:
+        _counters.clear()
+        _values.clear()
+        _timers.clear()
+    propagator.reset_stats()
+
+
+def count(name: str, k: int = 1):
+    if enabled:
+        with _lock:
+            _counters[name] += k
+
+
+def observe(name: str, value: float):
+    """Record one value of `name`, summarised as count, mean, min and max."""
+    if enabled:
+        with _lock:
+            entry = _values.get(name)
+            if entry is None:
+                _values[name] = [1, value, value, value]
+            else:
+                entry[0] += 1
+                entry[1] += value
+                entry[2] = min(entry[2], value)
+                entry[3] = max(entry[3], value)
+
+
+def _record(name: str, seconds: float):
+    with _lock:
+        entry = _timers[name]
+        entry[0] += 1
+        entry[1] += seconds
+
+
+@contextmanager
+def timer(name: str):
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    """Decorator recording the calls and wall time of a function under `name`."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def session():
+    """Reset, enable for the duration of the block, then disable; read the result with profile()."""
+    reset()
+    enable()
+    try:
+        yield
+    finally:
+        disable()
+
+
+def profile() -> dict:
+    """Counters, values, timers, propagator and cache statistics of this process, as plain data."""
+    import cache
+    import propagator
+
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "values": {name: {"count": c, "mean": s / c, "min": lo, "max": hi}
+                       for name, (c, s, lo, hi) in _values.items()},
+            "timers": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in _timers.items()},
+            "propagator": propagator.stats(),
+            "cache": cache.stats(),
+        }
+
+
+def write(path: str, data: dict = None):
+    with open(path, "w") as f:
+        json.dump(profile() if data is None else data, f, indent=2)
+
+
+def summary(data: dict = None) -> str:
+    """Plain-text table of a profile, slowest stages first."""
+    data = profile() if data is None else data
+    lines = [f"{'stage':<32}{'calls':>10}{'total ms':>12}{'per call µs':>14}"]
+    for name, entry in sorted(data["timers"].items(), key=lambda item: -item[1]["seconds"]):
+        calls, seconds = entry["calls"], entry["seconds"]
+        lines.append(f"{name:<32}{calls:>10}{seconds * 1e3:>12.2f}{seconds / calls * 1e6:>14.1f}")
+    counters = dict(data["counters"])
+    counters.update({f"propagator.{k}": v for k, v in data["propagator"].items()})
+    if counters:
+        lines.append("")
+        lines.append(f"{'counter':<32}{'value':>10}")
+        lines.extend(f"{name:<32}{value:>10}" for name, value in sorted(counters.items()))
+    if data["values"]:
+        lines.append("")
+        lines.append(f"{'value':<32}{'count':>10}{'mean':>12}{'min':>10}{'max':>10}")
+        lines.extend(f"{name:<32}{v['count']:>10}{v['mean']:>12.3f}{v['min']:>10.3g}{v['max']:>10.3g}"
+                     for name, v in sorted(data["values"].items()))
+    for name, stats in data["cache"].items():
+        lines.append(f"cache.{name}: {stats['hits']} hits, {stats['misses']} misses "
+                     f"({stats['hit_rate']:.1%}), {stats['entries']} entries")
+    return "\n".join(lines)
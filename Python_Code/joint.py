@@ -0,0 +1,197 @@
+import numpy as np
+
+from qubit import Qubit
+import instrument
+import measurement
+import propagator
+import sampling
+
+# Joint maximum-likelihood fit of (omega, kappa, gamma1, gamma2).
+#
+# A dataset is a set of measurement settings (initial Bloch vector, basis,
+# drive u, time t), each with a number of shots and of 1 outcomes. Every
+# setting's probability comes from the exact propagator, so the binomial
+# log-likelihood of the whole dataset and its gradient (through
+# propagator.propagator_gradient) are evaluated in one batched call. No
+# parameter is taken from the true qubit.
+
+PARAMETERS = ("omega", "kappa", "gamma1", "gamma2")
+_COLUMNS = [0, 2, 3, 4]  # positions of PARAMETERS in (omega, u, kappa, gamma1, gamma2)
+
+
+class Settings:
+    """Measurement settings as columns: v0 (N, 3), basis (N,), u (N,) and t (N,).
+
+    `weights` is the fraction of the shots each setting receives; uniform
+    unless set, e.g. by design.design().
+    """
+
+    # CONSTRUCTOR
+    def __init__(self, v0, basis, u, t, weights=None):
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        n = len(t)
+        self.v0 = np.broadcast_to(np.asarray(v0, dtype=float), (n, 3)).copy()
+        self.basis = np.broadcast_to(np.asarray(basis, dtype=object), (n,)).copy()
+        self.u = np.broadcast_to(np.asarray(u, dtype=float), (n,)).copy()
+        self.t = t
+        names = sorted(set(self.basis))
+        self.table = measurement.Table(names)
+        self.index = np.array([names.index(b) for b in self.basis], dtype=int)
+        weights = np.ones(n) if weights is None else np.broadcast_to(np.asarray(weights, dtype=float), (n,))
+        self.weights = weights / weights.sum()
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        return f"Settings(n={len(self)}, bases={sorted(set(self.basis))})"
+
+    def __len__(self):
+        return len(self.t)
+
+    def __getitem__(self, index):
+        return Settings(self.v0[index], self.basis[index], self.u[index], self.t[index], self.weights[index])
+
+    @classmethod
+    def concatenate(cls, *settings):
+        """One Settings holding all of `settings`; each part keeps its share len(part) / total of the shots."""
+        weights = np.concatenate([s.weights * len(s) for s in settings])
+        return cls(np.concatenate([s.v0 for s in settings]), np.concatenate([s.basis for s in settings]),
+                   np.concatenate([s.u for s in settings]), np.concatenate([s.t for s in settings]), weights)
+
+    def allocate(self, n: int) -> np.ndarray:
+        """Shots per setting, exactly n in total: one each, the rest in proportion to the weights.
+
+        The rest is split by largest remainder, so the total is never more
+        or less than n. Raises ValueError if n is below the number of settings.
+        """
+        n = int(n)
+        if n < len(self):
+            raise ValueError(f"{n} shots cannot cover {len(self)} settings")
+        quota = self.weights * (n - len(self))
+        shots = np.floor(quota).astype(int)
+        shots[np.argsort(shots - quota, kind="stable")[:n - len(self) - shots.sum()]] += 1
+        return shots + 1
+
+    def _rows(self, theta):
+        # (omega, u, kappa, gamma1, gamma2) rows of shape (M, N, 5) for parameter sets theta (M, 4)
+        theta = np.atleast_2d(np.asarray(theta, dtype=float))
+        rows = np.empty((len(theta), len(self), 5))
+        rows[..., _COLUMNS] = theta[:, None, :]
+        rows[..., 1] = self.u
+        return rows
+
+    def probabilities(self, theta):
+        """Probability of outcome 1 at every setting for parameter sets theta (M, 4), shape (M, N)."""
+        v = propagator.evolve(self._rows(theta), self.v0, self.t)
+        return np.take_along_axis(self.table.probabilities(v), self.index[None, :, None], -1)[..., 0]
+
+    def gradient(self, theta):
+        """Probabilities (N,) and their derivatives (N, 4) for one parameter set theta (4,).
+
+        For parameter sets theta (M, 4) the shapes are (M, N) and (M, N, 4).
+        """
+        P, dP = propagator.propagator_gradient(self._rows(theta), self.t)
+        v = propagator.apply(P, self.v0)
+        dv = propagator.apply(dP[..., _COLUMNS, :, :], self.v0[:, None, :])
+        A, C = self.table.A[self.index], self.table.C[self.index]
+        p = np.clip(A + np.einsum("...ni,ni->...n", v, C), 0, 1)
+        dp = np.einsum("...nki,ni->...nk", dv, C)
+        if np.ndim(theta) == 1:
+            return p[0], dp[0]
+        return p, dp
+
+
+def schedule(times=np.linspace(0.25, 4, 16), u: float = 1000) -> Settings:
+    """Default shared schedule: relaxation from |1⟩, Ramsey from |i⟩ and a strong drive from |1⟩.
+
+    Relaxation in the z basis fixes gamma1, free precession in the x_rot
+    basis fixes omega and gamma1 / 2 + 2 gamma2, and the drive at u (on the
+    1/u time scale) fixes kappa. The times span several periods, so omega
+    and kappa are not aliased.
+    """
+    times = np.asarray(times, dtype=float)
+    return Settings.concatenate(Settings((0, 0, -1), "z", 0, times),
+                                Settings((0, 1, 0), "x_rot", 0, times),
+                                Settings((0, 0, -1), "z", u, times / u))
+
+
+def simulate(qubit: Qubit, settings: Settings, shots, sampler=None) -> np.ndarray:
+    """Number of 1 outcomes at every setting, for `shots` (scalar or (N,)) shots each.
+
+    For a QubitArray each shot comes from the ensemble-averaged state.
+    """
+    p = settings.probabilities(np.column_stack(qubit.get_param())).mean(axis=0)
+    instrument.count("shots.measured", int(np.broadcast_to(shots, p.shape).sum()))
+    return sampling.resolve(sampler).counts(p, shots)
+
+
+class JointFit:
+    # CONSTRUCTOR
+    def __init__(self, theta, covariance, nll, shots, converged=True):
+        self.theta = theta                  # fitted (omega, kappa, gamma1, gamma2)
+        self.covariance = covariance        # inverse Fisher information at theta
+        self.nll = nll                      # negative log-likelihood per shot
+        self.shots = shots                  # total shots in the dataset
+        self.converged = converged
+        self.value = dict(zip(PARAMETERS, (float(x) for x in theta)))
+        self.stderr = dict(zip(PARAMETERS, (float(x) for x in np.sqrt(np.abs(np.diag(covariance))))))
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        values = ", ".join(f"{k}={v:.5f}±{self.stderr[k]:.5f}" for k, v in self.value.items())
+        return f"JointFit({values}, shots={self.shots})"
+
+    def qubit(self) -> Qubit:
+        return Qubit(*self.theta)
+
+
+def log_likelihood(settings: Settings, shots, successes, theta):
+    """Binomial log-likelihood (without the constant) for parameter sets theta (M, 4), shape (M,)."""
+    p = np.clip(settings.probabilities(theta), 1e-12, 1 - 1e-12)
+    return (successes * np.log(p) + (shots - successes) * np.log(1 - p)).sum(axis=-1)
+
+
+def fisher(settings: Settings, shots, theta):
+    """Fisher information matrix (4, 4) of the dataset's shots at theta, or (M, 4, 4) for theta (M, 4)."""
+    p, dp = settings.gradient(theta)
+    weight = shots / np.clip(p * (1 - p), 1e-12, None)
+    return np.einsum("...n,...ni,...nj->...ij", weight, dp, dp)
+
+
+@instrument.timed("joint.fit")
+def fit(settings: Settings, shots, successes, bounds=None, grid=(40, 20), starts: int = 4) -> JointFit:
+    """Maximum-likelihood (omega, kappa, gamma1, gamma2) from shot counts at every setting.
+
+    omega and kappa enter through oscillations, so the likelihood is
+    multimodal in them: it is first scanned on a `grid` over their bounds
+    (with the rates at the centre of theirs), and the `starts` best grid
+    points are refined by L-BFGS-B with the analytic gradient. `bounds` maps
+    parameter names to (low, high) and defaults to Qubit.RANGES.
+    """
+    from scipy.optimize import minimize
+
+    shots = np.broadcast_to(np.asarray(shots, dtype=float), (len(settings),))
+    successes = np.asarray(successes, dtype=float)
+    total = shots.sum()
+    box = np.array([(bounds or Qubit.RANGES)[name] for name in PARAMETERS], dtype=float)
+
+    omega, kappa = np.meshgrid(np.linspace(*box[0], grid[0]), np.linspace(*box[1], grid[1]), indexing="ij")
+    candidates = np.column_stack([omega.ravel(), kappa.ravel(),
+                                  np.full(omega.size, box[2].mean()), np.full(omega.size, box[3].mean())])
+    scores = log_likelihood(settings, shots, successes, candidates)
+    initial = candidates[np.argsort(scores)[::-1][:starts]]
+
+    def objective(theta):
+        p, dp = settings.gradient(theta)
+        p = np.clip(p, 1e-12, 1 - 1e-12)
+        value = -(successes * np.log(p) + (shots - successes) * np.log(1 - p)).sum()
+        grad = -((successes / p - (shots - successes) / (1 - p)) @ dp)
+        return value / total, grad / total
+
+    best = min((minimize(objective, x0, jac=True, method="L-BFGS-B", bounds=box) for x0 in initial),
+               key=lambda r: r.fun)
+    info = fisher(settings, shots, best.x)
+    try:
+        covariance = np.linalg.inv(info)
+    except np.linalg.LinAlgError:
+        covariance = np.full((4, 4), np.inf)
+    return JointFit(best.x, covariance, float(best.fun), int(total), bool(best.success))
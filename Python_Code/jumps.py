@@ -0,0 +1,175 @@
+import numpy as np
+
+from qubit import Qubit
+from control import Control
+import instrument
+import measurement
+
+# Quantum-jump (Monte Carlo wave function) trajectories of the Bloch model.
+#
+# The master equation behind System.evolve has
+#
+#     H  = (omega sz + u kappa sx) / 2
+#     L1 = sqrt(gamma1) s-      (decay towards |0⟩, z = +1)
+#     L2 = sqrt(gamma2) sz      (pure dephasing)
+#
+# Each trajectory is a pure state that evolves under the non-Hermitian
+# H_eff = H - i/2 sum L^† L until its norm falls below a uniform threshold
+# drawn for it, then jumps through L1 or L2 with probability proportional to
+# |L psi|^2 and draws a new threshold (Dalibard, Castin and Molmer, 1992).
+# All trajectories of a chunk advance together as an (m, 2) complex array;
+# the average of their Bloch vectors converges to the deterministic solution.
+#
+# With a `measure_basis`, every recording time is also a projective readout:
+# each trajectory collapses onto the eigenstate of its outcome, so the
+# readouts of one trajectory form a repeated-measurement record with
+# back-action.
+
+
+class TrajectoryChunk:
+    # CONSTRUCTOR
+    def __init__(self, times, states, jumps, readouts=None):
+        self.times = times        # (T,) recording times
+        self.states = states      # (m, T, 3) Bloch vector of every trajectory at every time, before any readout
+        self.jumps = jumps        # (m, T, 2) decay and dephasing jumps since the previous time
+        self.readouts = readouts  # (m, T) projective outcomes with collapse, when a measure_basis was given
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        return f"TrajectoryChunk(trajectories={len(self.states)}, times={len(self.times)})"
+
+    def outcomes(self, basis="z", rng=None) -> np.ndarray:
+        """One single-shot outcome (0 or 1) per trajectory and time in `basis`, shape (m, T).
+
+        The outcomes are independent readouts of the recorded states, with no
+        back-action on the trajectory; repeated-measurement records come from
+        trajectories(..., measure_basis=...) as `readouts`.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        p = measurement.Table([basis]).probabilities(self.states)[..., 0]
+        return (rng.random(p.shape) < p).astype(np.int8)
+
+
+def _expm2(M):
+    """exp(M) for a complex 2x2 matrix, through exp(a) (cosh(s) I + sinh(s) / s B) with B = M - a I traceless."""
+    a = np.trace(M) / 2
+    B = M - a * np.eye(2)
+    s = np.sqrt(B[0, 0] ** 2 + B[0, 1] * B[1, 0] + 0j)
+    sinhc = np.sinh(s) / s if abs(s) > 1e-8 else 1 + s ** 2 / 6
+    return np.exp(a) * (np.cosh(s) * np.eye(2) + sinhc * B)
+
+
+def _no_jump(qubit: Qubit, u: float, dt: float):
+    omega, kappa, gamma1, gamma2 = qubit.get_param()
+    H = 0.5 * np.array([[omega, u * kappa], [u * kappa, -omega]], dtype=complex)
+    decay = np.array([[gamma2, 0], [0, gamma1 + gamma2]], dtype=complex)  # L1^† L1 + L2^† L2
+    return _expm2(-1j * (H - 0.5j * decay) * dt)
+
+
+def _initial_states(v0, m: int, rng) -> np.ndarray:
+    # A mixed v0 (|v0| < 1) is sampled as its eigenstates +-n with probabilities (1 +- |v0|) / 2
+    v0 = np.asarray(v0, dtype=float)
+    r = np.linalg.norm(v0)
+    n = v0 / r if r > 0 else np.array([0.0, 0.0, 1.0])
+    sign = np.where(rng.random(m) < (1 + r) / 2, 1.0, -1.0)
+    theta = np.arccos(np.clip(sign * n[2], -1, 1))
+    phi = np.arctan2(sign * n[1], sign * n[0])
+    return np.column_stack([np.cos(theta / 2), np.exp(1j * phi) * np.sin(theta / 2)])
+
+
+def _pure_state(n) -> np.ndarray:
+    # State vector with unit Bloch vector n
+    theta = np.arccos(np.clip(n[2], -1, 1))
+    return np.array([np.cos(theta / 2), np.exp(1j * np.arctan2(n[1], n[0])) * np.sin(theta / 2)])
+
+
+def _projective(basis):
+    # Bloch direction m of the outcome-1 eigenstate: p(1) = (1 + m.v) / 2
+    table = measurement.Table([basis])
+    a, m = table.A[0], 2 * table.C[0]
+    if not (np.isclose(a, 0.5) and np.isclose(np.linalg.norm(m), 1)):
+        raise ValueError(f"measure_basis {basis!r} is not a projective measurement")
+    return table, np.stack([_pure_state(-m), _pure_state(m)])  # post-measurement states for outcomes 0 and 1
+
+
+def _bloch(psi) -> np.ndarray:
+    c = np.conj(psi[:, 0]) * psi[:, 1]
+    return np.column_stack([2 * c.real, 2 * c.imag, np.abs(psi[:, 0]) ** 2 - np.abs(psi[:, 1]) ** 2])
+
+
+def trajectories(qubit: Qubit, control: Control, v0, times, n: int, dt: float = 0.005,
+                 chunk: int = 10000, rng=None, measure_basis=None):
+    """Generate n quantum-jump trajectories from v0, `chunk` at a time.
+
+    Yields a TrajectoryChunk per chunk, so memory is bounded by chunk x
+    len(times). `times` are rounded to the step dt; the control may be a
+    constant drive or a Control.sequence. With `measure_basis` (a projective
+    basis such as "z" or "x_rot"), every trajectory is measured at every
+    recording time and collapses onto its outcome, kept in `readouts`.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    _, _, gamma1, gamma2 = qubit.get_param()
+    times = np.asarray(times, dtype=float)
+    record = np.rint(times / dt).astype(int)
+    steps = int(record.max(initial=0))
+    readout = _projective(measure_basis) if measure_basis is not None else None
+
+    # Recording times falling on each step, found once
+    at_step = {}
+    for i, k in enumerate(record.tolist()):
+        at_step.setdefault(k, []).append(i)
+
+    # Drive during every step (segment boundaries rounded to the step), and
+    # the no-jump propagator of each distinct drive
+    drive = [u for u, d in control.until(steps * dt) for _ in range(int(round(d / dt)))]
+    drive = np.array((drive + drive[-1:] * steps)[:steps] if drive else [0.0] * steps)
+    propagators = {u: _no_jump(qubit, u, dt) for u in np.unique(drive)}
+
+    for start in range(0, n, chunk):
+        m = min(chunk, n - start)
+        instrument.count("jumps.trajectories", m)
+        psi = _initial_states(v0, m, rng)
+        threshold = rng.random(m)
+        states = np.empty((m, len(times), 3))
+        jumps = np.zeros((m, len(times), 2), dtype=np.int32)
+        readouts = np.zeros((m, len(times)), dtype=np.int8) if readout is not None else None
+        counts = np.zeros((m, 2), dtype=np.int32)
+        last = np.zeros((m, 2), dtype=np.int32)
+        for k in range(steps + 1):
+            for i in at_step.get(k, ()):
+                norm = np.sqrt(np.sum(np.abs(psi) ** 2, axis=1))[:, None]
+                states[:, i] = _bloch(psi / norm)
+                jumps[:, i] = counts - last
+                last = counts.copy()
+                if readout is not None:
+                    # Collapse onto the outcome's eigenstate, keeping the norm
+                    # that the pending jump thresholds are compared against
+                    table, collapsed = readout
+                    outcome = (rng.random(m) < table.probabilities(states[:, i])[:, 0]).astype(np.int8)
+                    readouts[:, i] = outcome
+                    psi = collapsed[outcome] * norm
+            if k == steps:
+                break
+            psi = psi @ propagators[drive[k]].T
+            norm2 = np.sum(np.abs(psi) ** 2, axis=1)
+            jumped = np.flatnonzero(norm2 < threshold)
+            if len(jumped):
+                p = psi[jumped]
+                decay = gamma1 * np.abs(p[:, 1]) ** 2
+                dephase = gamma2 * norm2[jumped]
+                is_decay = rng.random(len(jumped)) * (decay + dephase) < decay
+                p = np.where(is_decay[:, None], np.column_stack([p[:, 1], np.zeros(len(p))]),
+                             p * np.array([1, -1]))
+                psi[jumped] = p / np.sqrt(np.sum(np.abs(p) ** 2, axis=1))[:, None]
+                counts[jumped, np.where(is_decay, 0, 1)] += 1
+                threshold[jumped] = rng.random(len(jumped))
+        yield TrajectoryChunk(times, states, jumps, readouts)
+
+
+def ensemble_average(qubit: Qubit, control: Control, v0, times, n: int, dt: float = 0.005,
+                     chunk: int = 10000, rng=None) -> np.ndarray:
+    """Mean Bloch vector (T, 3) over n trajectories, accumulated chunk by chunk."""
+    total = 0.0
+    for c in trajectories(qubit, control, v0, times, n, dt, chunk, rng):
+        total = total + c.states.sum(axis=0)
+    return total / n
@@ -0,0 +1,97 @@
+import numpy as np
+
+import sampling
+
+# Measurement kernel working directly on Bloch vectors.
+#
+# For any 2x2 observable O and density matrix rho = (I + v.sigma) / 2,
+#
+#     Tr(O rho) = Tr(O) / 2 + sum_i Tr(O sigma_i) / 2 * v_i = a + c . v
+#
+# so each observable reduces to an offset a and a 3-vector c, and a set of
+# observables to a Table of arrays A (k,) and C (k, 3) applied to many states
+# at once.
+
+_I = np.eye(2)
+_SX = np.array([[0, 1], [1, 0]], dtype=complex)
+_SY = np.array([[0, -1j], [1j, 0]])
+_SZ = np.array([[1, 0], [0, -1]], dtype=complex)
+_E1 = np.array([[0, 0], [0, 1]], dtype=complex)  # projector onto |1⟩
+
+
+def affine(O) -> tuple:
+    """Offset a and vector c such that Tr(O rho) = a + c . v."""
+    O = np.asarray(O, dtype=complex)
+    a = np.real(np.trace(O)) / 2
+    c = np.real([np.trace(O @ s) for s in (_SX, _SY, _SZ)]) / 2
+    return a, c
+
+
+def rotated(sigma, theta: float = np.pi / 4):
+    """Projector onto |1⟩ measured after the rotation U = exp(i theta sigma)."""
+    U = np.cos(theta) * _I + 1j * np.sin(theta) * sigma
+    return U @ _E1 @ U.conj().T
+
+
+# Precomputed measurement bases; each gives the probability of outcome 1
+BASES = {
+    "z": affine(_E1),
+    "x_rot": affine(rotated(_SX)),  # exp(iπ/4 σx) rotation, as in the ω and γ₂ protocols
+    "y_rot": affine(rotated(_SY)),
+}
+
+
+def axis(n) -> tuple:
+    """Basis along the unit vector n: outcome 1 is the -n eigenstate, so p = (1 - n.v) / 2."""
+    n = np.asarray(n, dtype=float)
+    return 0.5, -0.5 * n / np.linalg.norm(n)
+
+
+def _entry(observable) -> tuple:
+    if isinstance(observable, str):
+        return BASES[observable]
+    observable = np.asarray(observable)
+    if observable.shape == (3,):
+        return axis(observable)
+    return affine(observable)
+
+
+class Table:
+    """A set of observables (basis names, 2x2 matrices or 3-vector axes) stacked as A (k,) and C (k, 3)."""
+
+    # CONSTRUCTOR
+    def __init__(self, observables):
+        entries = [_entry(o) for o in observables]
+        self.A = np.array([a for a, _ in entries])
+        self.C = np.array([c for _, c in entries]).reshape(len(entries), 3)
+
+    def __len__(self):
+        return len(self.A)
+
+    def probabilities(self, v):
+        """Probability of outcome 1 for Bloch vectors v (..., 3), shape (..., k)."""
+        return np.clip(self.A + np.asarray(v, dtype=float) @ self.C.T, 0, 1)
+
+    def sample(self, v, n: int, sampler=None):
+        """Number of 1 outcomes in n shots for every state and observable, shape (..., k)."""
+        return sampling.resolve(sampler).counts(self.probabilities(v), n)
+
+
+def probabilities(v, observables):
+    table = observables if isinstance(observables, Table) else Table(observables)
+    return table.probabilities(v)
+
+
+def sample(v, observables, n: int, sampler=None):
+    table = observables if isinstance(observables, Table) else Table(observables)
+    return table.sample(v, n, sampler)
+
+
+def excited_probability(v):
+    """Probability of |1⟩ for Bloch vectors v of shape (..., 3)."""
+    return BASES["z"][0] + np.asarray(v) @ BASES["z"][1]
+
+
+def rotated_excited_probability(v):
+    """Probability of |1⟩ after the exp(iπ/4 σx) rotation, for Bloch vectors v."""
+    return BASES["x_rot"][0] + np.asarray(v) @ BASES["x_rot"][1]
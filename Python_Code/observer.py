@@ -1,30 +1,52 @@
-from qubit import Qubit
+from qubit import Qubit, QubitArray
 from control import Control
 from system import System
-from utils import sx, sy, sz
-import numpy as np
+import instrument
+import measurement
+import sampling
 
 class Observer:
-    def __init__(self, obs):
-        self.obs = obs  # Observable, e.g., np.array([[0, 0], [0, 1]])
+    def __init__(self, obs, sampler=None):
+        # Observable, e.g., np.array([[0, 0], [0, 1]]), a basis name from
+        # measurement.BASES ("z", "x_rot", ...), an axis, or a list of these
+        self.set_obs(obs)
+        self.sampler = sampler  # ShotSampler; None uses the process-wide default
 
     def get_obs(self):
         return self.obs
 
     def set_obs(self, o):
         self.obs = o
+        self.multiple = isinstance(o, (list, tuple))
+        self.table = measurement.Table(o if self.multiple else [o])
 
-    def measure(self, system: System, qubit: Qubit, control: Control, t: float, n: int) -> float:
-        # Evolve the system's state to time t
+    def probabilities(self, system: System, qubit: Qubit, control: Control, t: float):
+        """Evolve the system to time t and return the probability of each observable."""
         system.evolve(qubit, control, t)
-        x, y, z = system.get_coordinates()
+        p = self.table.probabilities(system.get_coordinates())
+        return p if self.multiple else float(p[0])
 
-        # Construct the density matrix using the Pauli basis
-        rho = 0.5 * (np.eye(2) + x * sx + y * sy + z * sz)
+    @instrument.timed("observer.measure")
+    def measure(self, system: System, qubit: Qubit, control: Control, t: float, n: int):
+        """Frequency of outcome 1 in n shots, one per observable when given a list.
 
-        # Compute the probability of measuring the observable
-        p = np.real(np.trace(self.obs @ rho))
+        A single evolution feeds every observable in the set.
+        """
+        p = self.probabilities(system, qubit, control, t)
+        instrument.count("shots.measured", n * (len(p) if self.multiple else 1))
 
         # Simulate n measurements using a binomial distribution
-        results = np.random.binomial(n=1, p=p, size=n)
-        return np.sum(results) / n
\ No newline at end of file
+        return sampling.resolve(self.sampler).frequency(p, n)
+
+
+def ensemble_truth(qubit, control: Control, basis, system: System):
+    """Outcome probability t -> p of a QubitArray prepared in the current state of `system`.
+
+    None for a single Qubit, whose model at its own parameters is the truth.
+    Elimination takes this as its `truth`, so an ensemble is measured
+    itself rather than through the mean parameters of its candidates.
+    """
+    if not isinstance(qubit, QubitArray):
+        return None
+    prepared = System.copy(system)
+    return lambda t: Observer(basis).probabilities(System.copy(prepared), qubit, control, t)
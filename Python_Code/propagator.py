@@ -0,0 +1,205 @@
+import numpy as np
+
+import instrument
+
+# Exact solution of the Bloch equation dv/dt = Jv + b.
+#
+# The affine system is written as a linear one on the augmented vector
+# (x, y, z, 1):
+#
+#     d/dt [v]   [J  b] [v]
+#          [1] = [0  0] [1]
+#
+# so that v(t) = P[:3, :3] v0 + P[:3, 3] with P = exp(G t). The matrix
+# exponential is evaluated with the scaling and squaring Pade method of
+# Higham (2005), vectorized over any leading batch dimensions.
+
+# Pade coefficients b_0..b_m and the 1-norm bound theta_m below which the
+# degree-m approximant is accurate to double precision (Higham 2005)
+_PADE = {
+    3: (120.0, 60.0, 12.0, 1.0),
+    5: (30240.0, 15120.0, 3360.0, 420.0, 30.0, 1.0),
+    7: (17297280.0, 8648640.0, 1995840.0, 277200.0, 25200.0, 1512.0, 56.0,
+        1.0),
+    9: (17643225600.0, 8821612800.0, 2075673600.0, 302702400.0, 30270240.0,
+        2162160.0, 110880.0, 3960.0, 90.0, 1.0),
+    13: (64764752532480000.0, 32382376266240000.0, 7771770303897600.0,
+         1187353796428800.0, 129060195264000.0, 10559470521600.0,
+         670442572800.0, 33522128640.0, 1323241920.0, 40840800.0, 960960.0,
+         16380.0, 182.0, 1.0),
+}
+_THETA = {3: 1.495585217958292e-2, 5: 2.539398330063230e-1,
+          7: 9.504178996162932e-1, 9: 2.097847961257068, 13: 5.371920351148152}
+
+# Number of propagator() calls and of matrices exponentiated, for benchmarks
+_stats = {"calls": 0, "matrices": 0}
+
+
+def stats() -> dict:
+    return dict(_stats)
+
+
+def reset_stats():
+    _stats["calls"] = 0
+    _stats["matrices"] = 0
+
+
+def generator(omega, u, kappa, gamma1, gamma2):
+    """Augmented generator [[J, b], [0, 0]], broadcast over the parameters."""
+    omega, u, kappa, gamma1, gamma2 = np.broadcast_arrays(
+        *(np.asarray(p, dtype=float) for p in (omega, u, kappa, gamma1, gamma2))
+    )
+    gamma = -gamma1 / 2 - 2 * gamma2
+    G = np.zeros(omega.shape + (4, 4))
+    G[..., 0, 0] = gamma
+    G[..., 0, 1] = -omega
+    G[..., 1, 0] = omega
+    G[..., 1, 1] = gamma
+    G[..., 1, 2] = -u * kappa
+    G[..., 2, 1] = u * kappa
+    G[..., 2, 2] = -gamma1
+    G[..., 2, 3] = gamma1
+    return G
+
+
+def generator_gradient(omega, u, kappa, gamma1, gamma2):
+    """Derivatives of generator() with respect to (omega, u, kappa, gamma1, gamma2), shape (..., 5, 4, 4)."""
+    omega, u, kappa, gamma1, gamma2 = np.broadcast_arrays(
+        *(np.asarray(p, dtype=float) for p in (omega, u, kappa, gamma1, gamma2))
+    )
+    dG = np.zeros(omega.shape + (5, 4, 4))
+    dG[..., 0, 1, 0] = 1
+    dG[..., 0, 0, 1] = -1
+    dG[..., 1, 2, 1] = kappa
+    dG[..., 1, 1, 2] = -kappa
+    dG[..., 2, 2, 1] = u
+    dG[..., 2, 1, 2] = -u
+    dG[..., 3, 0, 0] = dG[..., 3, 1, 1] = -0.5
+    dG[..., 3, 2, 2] = -1
+    dG[..., 3, 2, 3] = 1
+    dG[..., 4, 0, 0] = dG[..., 4, 1, 1] = -2
+    return dG
+
+
+def expm(A):
+    """Matrix exponential of a stack of square matrices of shape (..., m, m)."""
+    A = np.asarray(A, dtype=float)
+    norm = np.abs(A).sum(axis=-2).max(axis=-1)
+    largest = norm.max(initial=0.0)
+
+    # Lowest Pade degree that covers the whole batch; beyond that, degree 13
+    # with each matrix scaled by its own power of two
+    s = 0
+    for m in (3, 5, 7, 9):
+        if largest <= _THETA[m]:
+            break
+    else:
+        m = 13
+        s = np.maximum(0, np.ceil(np.log2(np.maximum(norm, 1e-300) / _THETA[13]))).astype(int)
+        A = A / (2.0 ** s)[..., None, None]
+
+    b = _PADE[m]
+    I = np.eye(A.shape[-1])
+    A2 = A @ A
+    if m == 13:
+        A4 = A2 @ A2
+        A6 = A4 @ A2
+        U = A @ (A6 @ (b[13] * A6 + b[11] * A4 + b[9] * A2)
+                 + b[7] * A6 + b[5] * A4 + b[3] * A2 + b[1] * I)
+        V = (A6 @ (b[12] * A6 + b[10] * A4 + b[8] * A2)
+             + b[6] * A6 + b[4] * A4 + b[2] * A2 + b[0] * I)
+    else:
+        # Even powers A^0, A^2, ..., A^(m-1) shared by U and V
+        powers = [I, A2]
+        while len(powers) < (m + 1) // 2:
+            powers.append(powers[-1] @ A2)
+        U = A @ sum(b[2 * k + 1] * P for k, P in enumerate(powers))
+        V = sum(b[2 * k] * P for k, P in enumerate(powers))
+    X = np.linalg.solve(V - U, V + U)
+
+    # Undo the scaling, squaring each matrix only as often as it was scaled
+    for k in range(int(np.max(s))):
+        X = np.where((k < s)[..., None, None], X @ X, X)
+    return X
+
+
+@instrument.timed("propagator.propagator")
+def propagator(params, t):
+    """Affine propagator exp(G t) for parameters (omega, u, kappa, gamma1, gamma2).
+
+    `params` has shape (..., 5) and `t` shape (...); both broadcast.
+    """
+    params = np.asarray(params, dtype=float)
+    t = np.asarray(t, dtype=float)
+    G = generator(*np.moveaxis(params, -1, 0)) * t[..., None, None]
+    _stats["calls"] += 1
+    _stats["matrices"] += G.size // 16
+    return expm(G)
+
+
+@instrument.timed("propagator.gradient")
+def propagator_gradient(params, t):
+    """Propagator exp(G t) and its derivatives with respect to the five parameters.
+
+    Each derivative is the upper-right block of exp([[G t, dG t], [0, G t]])
+    (Van Loan, 1978), so it is exact to the same precision as the propagator.
+    Returns P of shape (..., 4, 4) and dP of shape (..., 5, 4, 4).
+    """
+    params = np.asarray(params, dtype=float)
+    t = np.asarray(t, dtype=float)
+    args = np.moveaxis(params, -1, 0)
+    A = generator(*args) * t[..., None, None]
+    dA = generator_gradient(*args) * t[..., None, None, None]
+    M = np.zeros(dA.shape[:-2] + (8, 8))
+    M[..., :4, :4] = M[..., 4:, 4:] = A[..., None, :, :]
+    M[..., :4, 4:] = dA
+    _stats["calls"] += 1
+    _stats["matrices"] += M.size // 64
+    X = expm(M)
+    return X[..., 0, :4, :4], X[..., :4, 4:]
+
+
+def sequence(params, amplitudes, durations, t):
+    """Propagator from 0 to t under a piecewise-constant drive, batched over schedules.
+
+    `params` (..., 4) holds (omega, kappa, gamma1, gamma2), `amplitudes` and
+    `durations` (..., K) the segments, and the drive is off after the last
+    one. Every segment of every schedule is exponentiated in one batched
+    call, then the K + 1 factors are composed with 4x4 products.
+    """
+    params = np.asarray(params, dtype=float)
+    amplitudes = np.asarray(amplitudes, dtype=float)
+    durations = np.asarray(durations, dtype=float)
+    t = np.asarray(t, dtype=float)
+    K = amplitudes.shape[-1]
+    shape = np.broadcast_shapes(params.shape[:-1], amplitudes.shape[:-1], durations.shape[:-1], t.shape)
+    params = np.broadcast_to(params, shape + (4,))
+    amplitudes = np.broadcast_to(amplitudes, shape + (K,))
+    durations = np.broadcast_to(durations, shape + (K,))
+    t = np.broadcast_to(t, shape)
+
+    # Time spent in each segment by t, then in the undriven tail
+    starts = np.cumsum(durations, axis=-1) - durations
+    spent = np.clip(t[..., None] - starts, 0, durations)
+    spent = np.concatenate([spent, np.maximum(t - durations.sum(axis=-1), 0)[..., None]], axis=-1)
+
+    rows = np.empty(shape + (K + 1, 5))
+    rows[..., [0, 2, 3, 4]] = params[..., None, :]
+    rows[..., :K, 1] = amplitudes
+    rows[..., K, 1] = 0
+    P = propagator(rows, spent)
+    out = P[..., 0, :, :]
+    for k in range(1, K + 1):
+        out = P[..., k, :, :] @ out
+    return out
+
+
+def apply(P, v0):
+    """Apply affine propagators of shape (..., 4, 4) to Bloch vectors (..., 3)."""
+    v0 = np.asarray(v0, dtype=float)
+    return np.einsum("...ij,...j->...i", P[..., :3, :3], v0) + P[..., :3, 3]
+
+
+def evolve(params, v0, t):
+    """Bloch vector at time t starting from v0, exact for the constant drive u."""
+    return apply(propagator(params, t), v0)
@@ -2,6 +2,9 @@ import numpy as np
 
 
 class Qubit : 
+    # Prior ranges used by random()
+    RANGES = {"omega": (0.5, 5), "kappa": (0.1, 2), "gamma1": (0.1, 1), "gamma2": (0.01, 0.5)}
+
     # CONSTRUCTORS
     def __init__(self,omega,kappa,gamma1,gamma2) : 
         self.omega = omega
@@ -10,11 +13,13 @@ class Qubit :
         self.gamma2 = gamma2
     
     @classmethod
-    def random(cls):
-        omega = np.random.uniform(0.5, 5)
-        kappa = np.random.uniform(0.1, 2)
-        gamma1 = np.random.uniform(0.1, 1)
-        gamma2 = np.random.uniform(0.01, 0.5)
+    def random(cls, rng=None):
+        # rng: numpy Generator for reproducible draws; defaults to a fresh one
+        rng = np.random.default_rng() if rng is None else rng
+        omega = rng.uniform(*cls.RANGES["omega"])
+        kappa = rng.uniform(*cls.RANGES["kappa"])
+        gamma1 = rng.uniform(*cls.RANGES["gamma1"])
+        gamma2 = rng.uniform(*cls.RANGES["gamma2"])
         return cls(omega, kappa, gamma1, gamma2)
 
     @classmethod
@@ -48,4 +53,98 @@ class Qubit :
         if gamma1 is not None : self.gamma1 = gamma1
         if gamma2 is not None : self.gamma2 = gamma2
     
-    
\ No newline at end of file
+    
+
+class QubitArray:
+    """An ensemble of qubits stored as one NumPy column per parameter.
+
+    Evolving a System with a QubitArray gives the ensemble-averaged Bloch
+    vector (the Bloch vector of the mixed state), so every Observer and
+    Estimator built on System.evolve measures the ensemble signal.
+    """
+
+    NAMES = ("omega", "kappa", "gamma1", "gamma2")
+
+    # CONSTRUCTORS
+    def __init__(self, omega, kappa, gamma1, gamma2):
+        self.omega, self.kappa, self.gamma1, self.gamma2 = (
+            np.array(p, dtype=float) for p in np.broadcast_arrays(omega, kappa, gamma1, gamma2))
+        if self.omega.ndim != 1:
+            raise ValueError("QubitArray columns must be one-dimensional")
+
+    @classmethod
+    def random(cls, n: int, rng=None):
+        """n qubits drawn uniformly from Qubit.RANGES, as Qubit.random does one at a time."""
+        rng = np.random.default_rng() if rng is None else rng
+        return cls(*(rng.uniform(*Qubit.RANGES[name], n) for name in cls.NAMES))
+
+    @classmethod
+    def around(cls, center: Qubit, n: int, spread: dict, distribution: str = "normal", rng=None):
+        """n qubits scattered around `center`, e.g. inhomogeneous broadening of omega.
+
+        `spread` maps parameter names to a width: the standard deviation for
+        "normal", the half-width at half-maximum for "lorentzian" and the
+        half-width for "uniform". Rates are kept non-negative.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        draw = {"normal": lambda w: rng.normal(0, w, n),
+                "lorentzian": lambda w: w * rng.standard_cauchy(n),
+                "uniform": lambda w: rng.uniform(-w, w, n)}[distribution]
+        columns = [getattr(center, name) + (draw(spread[name]) if spread.get(name) else np.zeros(n))
+                   for name in cls.NAMES]
+        columns[2:] = [np.abs(c) for c in columns[2:]]
+        return cls(*columns)
+
+    @classmethod
+    def from_qubits(cls, qubits):
+        return cls(*np.array([q.get_param() for q in qubits], dtype=float).reshape(-1, 4).T)
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        means = ", ".join(f"{name}={getattr(self, name).mean():.5f}" for name in self.NAMES)
+        return f"QubitArray(n={len(self)}, mean {means})"
+
+    def __len__(self):
+        return len(self.omega)
+
+    def __getitem__(self, index):
+        # A single Qubit for an integer index, a QubitArray for slices and masks
+        if np.ndim(index) == 0 and not isinstance(index, slice):
+            return Qubit(*(float(getattr(self, name)[index]) for name in self.NAMES))
+        return QubitArray(*(getattr(self, name)[index] for name in self.NAMES))
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    # GETTERS
+    def get_param(self):
+        return [self.omega, self.kappa, self.gamma1, self.gamma2]
+
+    def params(self) -> np.ndarray:
+        """Parameters as an (n, 4) array of (omega, kappa, gamma1, gamma2)."""
+        return np.column_stack(self.get_param())
+
+    def mean(self) -> Qubit:
+        return Qubit(*(float(getattr(self, name).mean()) for name in self.NAMES))
+
+    def drift(self, dt: float, rates: dict = None, diffusion: dict = None, rng=None):
+        """The ensemble after a time dt of linear drift (`rates`) and random walk (`diffusion`).
+
+        Both map parameter names to per-unit-time values; the random walk has
+        standard deviation diffusion * sqrt(dt). Rates are kept non-negative.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        rates, diffusion = rates or {}, diffusion or {}
+        columns = [getattr(self, name) + rates.get(name, 0.0) * dt
+                   + (diffusion[name] * np.sqrt(dt) * rng.standard_normal(len(self)) if diffusion.get(name) else 0)
+                   for name in self.NAMES]
+        columns[2:] = [np.abs(c) for c in columns[2:]]
+        return QubitArray(*columns)
+
+
+def nominal(qubit) -> Qubit:
+    """The single Qubit standing for `qubit`: the qubit itself, or the mean of a QubitArray.
+
+    The estimators take their nuisance parameters from it.
+    """
+    return qubit.mean() if isinstance(qubit, QubitArray) else qubit
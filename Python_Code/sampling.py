@@ -0,0 +1,107 @@
+import numpy as np
+
+import instrument
+
+
+class ShotSampler:
+    """Draws measurement shot counts from an explicit numpy Generator.
+
+    The n single-shot outcomes of a measurement with excitation probability p
+    are never materialised: their sum is drawn directly from Binomial(n, p),
+    which is exact and O(1) in memory whatever n is.
+    """
+
+    # CONSTRUCTOR
+    def __init__(self, seed=None):
+        # seed: None, an int, a SeedSequence or an existing Generator
+        if isinstance(seed, np.random.Generator):
+            self.rng = seed
+        else:
+            self.rng = np.random.default_rng(seed)
+        self.shots = 0  # total number of shots drawn so far
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        return f"ShotSampler(shots={self.shots})"
+
+    # SAMPLING
+    @instrument.timed("sampling.counts")
+    def counts(self, p, n):
+        """Number of |1⟩ outcomes in n shots; p and n may be scalars or broadcasting arrays."""
+        n = np.asarray(n, dtype=np.int64)
+        p = np.clip(p, 0, 1)
+        drawn = int(np.broadcast_to(n, np.broadcast(n, p).shape).sum())
+        self.shots += drawn
+        instrument.count("shots.drawn", drawn)
+        return self.rng.binomial(n, p)
+
+    def frequency(self, p, n):
+        """Empirical frequency of |1⟩ in n shots."""
+        return self.counts(p, n) / np.asarray(n)
+
+    def counts_until(self, p: float, stop, batch: int, max_shots: int):
+        """Draw batches of shots until stop(p_hat, se) is true or max_shots are used.
+
+        se is the binomial standard error of p_hat. Returns (successes, shots).
+        """
+        rule = batches_until(stop, batch, max_shots)
+        try:
+            size = next(rule)
+            while True:
+                size = rule.send(self.counts(p, size))
+        except StopIteration as done:
+            return done.value
+
+    def uniform(self, low: float, high: float):
+        return self.rng.uniform(low, high)
+
+    # STREAMS
+    def spawn(self, k: int) -> list:
+        """k statistically independent child samplers, e.g. one per worker."""
+        return [ShotSampler(rng) for rng in self.rng.spawn(k)]
+
+
+def batches_until(stop, batch: int, max_shots: int):
+    """Stopping rule of counts_until, as a generator.
+
+    Yields the size of the next batch and expects its number of 1 outcomes
+    to be sent back, until stop(p_hat, se) is true or max_shots are used;
+    returns (successes, shots). The shots may come from a sampler or from a
+    remote instrument (acounts_until).
+    """
+    successes = shots = 0
+    while shots < max_shots:
+        size = min(int(batch), int(max_shots) - shots)
+        successes += yield size
+        shots += size
+        # Shrunk estimate (k + 1) / (N + 2) keeps se > 0 at p_hat = 0 or 1
+        p_tilde = (successes + 1) / (shots + 2)
+        if stop(successes / shots, np.sqrt(p_tilde * (1 - p_tilde) / shots)):
+            break
+    return successes, shots
+
+
+async def acounts_until(measure, stop, batch: int, max_shots: int):
+    """counts_until with the shots of each batch drawn by `await measure(size)`; returns (successes, shots)."""
+    rule = batches_until(stop, batch, max_shots)
+    try:
+        size = next(rule)
+        while True:
+            size = rule.send(await measure(size))
+    except StopIteration as done:
+        return done.value
+
+
+_default = ShotSampler()
+
+
+def seed(value=None):
+    """Reseed the process-wide default sampler."""
+    global _default
+    _default = ShotSampler(value)
+    return _default
+
+
+def resolve(sampler=None) -> ShotSampler:
+    """The given sampler, or the process-wide default when it is None."""
+    return _default if sampler is None else sampler
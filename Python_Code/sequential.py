@@ -0,0 +1,165 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from qubit import Qubit, nominal
+from control import Control
+from system import System
+from observer import Observer, ensemble_truth
+from utils import EliminationAlgorithmKappa, EliminationAlgorithmOmega2, alias_candidates, gamma2_from, \
+    omega_candidates
+import instrument
+import sampling
+
+
+class SequentialResult:
+    # CONSTRUCTOR
+    def __init__(self, value, interval, shots, baseline_shots, elimination=None, alias_gap=None):
+        self.value = value                    # estimate, or None if elimination failed
+        self.interval = interval              # (low, high) confidence interval
+        self.shots = shots                    # shots spent on the true system
+        self.baseline_shots = baseline_shots  # shots the fixed-n protocol would spend
+        self.elimination = elimination        # EliminationResult for kappa / omega
+        self.alias_gap = alias_gap            # kappa / omega: distance to the nearest eliminated candidate
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        return (f"SequentialResult(value={self.value}, interval=({self.interval[0]:.5f}, "
+                f"{self.interval[1]:.5f}), shots={self.shots}, baseline_shots={self.baseline_shots})")
+
+
+class SequentialEstimator:
+    """Adaptive-shot versions of the Estimator protocols.
+
+    Shots are drawn in batches and the estimate and its confidence interval
+    are updated after each batch, stopping as soon as the interval half-width
+    reaches the requested precision (or `max_shots` per setting are spent).
+    The protocols, preparations and timings are those of Estimator.
+
+    For kappa and omega the precision applies to the first measurement,
+    which fixes the angle theta; the elimination rounds then only pick one
+    of its aliases (+-theta + k pi) / t. The interval therefore holds when
+    the right alias survives, and `alias_gap` is the error if a wrong one
+    had: the distance from the estimate to the nearest other candidate.
+    """
+
+    # CONSTRUCTOR
+    def __init__(self, system: System, sampler=None, batch: int = 1000, max_shots: int = 10**6,
+                 confidence: float = 0.95, baseline_n: int = 100000):
+        self.system = system
+        self.sampler = sampler
+        self.batch = batch
+        self.max_shots = max_shots
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.baseline_n = baseline_n  # n of the fixed-shot protocol used for comparison
+
+    def _probability(self, qubit, control, t, basis):
+        # Exact probability at this setting, from a fresh copy of the prepared state
+        return Observer(basis).probabilities(System.copy(self.system), qubit, control, t)
+
+    def _sample(self, p, stop):
+        successes, shots = sampling.resolve(self.sampler).counts_until(p, stop, self.batch, self.max_shots)
+        instrument.count("shots.measured", shots)
+        return successes, shots
+
+    def estimate_gamma1(self, qubit: Qubit, precision: float) -> SequentialResult:
+        control = Control(u=0)
+        t = 2.0
+        # gamma1 = -ln(p) / t, so its standard error is se / (p t)
+        spread = lambda p_hat, se: se / (max(p_hat, 1e-12) * t)
+        k, shots = self._sample(self._probability(qubit, control, t, "z"),
+                                lambda p_hat, se: self.z * spread(p_hat, se) <= precision)
+        p_hat = k / shots
+        gamma1 = -np.log(p_hat) / t
+        se = spread(p_hat, np.sqrt(p_hat * (1 - p_hat) / shots))
+        return SequentialResult(gamma1, (gamma1 - self.z * se, gamma1 + self.z * se),
+                                shots, self.baseline_n)
+
+    def estimate_gamma2(self, qubit: Qubit, precision: float) -> SequentialResult:
+        control = Control(u=0)
+        t = 1.0
+        p = [self._probability(qubit, control, t, "x_rot"),
+             self._probability(qubit, control, 2 * t, "x_rot")]
+        counts = np.zeros(2)
+        shots = np.zeros(2)
+        sampler = sampling.resolve(self.sampler)
+
+        # gamma2 = -ln(L) / (4t) - gamma1 / 4 with L = 2 s2 - 1 + 2 (1 - 2 s1)^2
+        def spread(s, n):
+            L = 2 * s[1] - 1 + 2 * (1 - 2 * s[0]) ** 2
+            grad = np.array([2 * (1 - 2 * s[0]) / (t * L), -1 / (2 * t * L)])
+            var = grad ** 2 * s * (1 - s) / np.maximum(n, 1)
+            return L, var
+
+        while shots.sum() < 2 * self.max_shots:
+            # Next batch goes to whichever setting contributes most variance
+            if shots.min() == 0:
+                i = int(np.argmin(shots))
+            else:
+                i = int(np.argmax(spread(counts / shots, shots)[1] / shots))
+            counts[i] += sampler.counts(p[i], self.batch)
+            instrument.count("shots.measured", self.batch)
+            shots[i] += self.batch
+            if shots.min() > 0:
+                L, var = spread(counts / shots, shots)
+                if L > 0 and self.z * np.sqrt(var.sum()) <= precision:
+                    break
+
+        s = counts / shots
+        gamma2 = gamma2_from(s[0], s[1], t, nominal(qubit).get_gamma1())
+        half = self.z * np.sqrt(spread(s, shots)[1].sum())
+        return SequentialResult(gamma2, (gamma2 - half, gamma2 + half), int(shots.sum()),
+                                2 * self.baseline_n)
+
+    def estimate_kappa(self, qubit: Qubit, precision: float, progress=None) -> SequentialResult:
+        control = Control(u=1000)
+        t = 1 / control.get_u()
+
+        # theta = arccos(2p - 1); kappa candidates are +-theta + k pi
+        spread = lambda p_hat, se: 2 * se / np.sqrt(max(1 - (2 * p_hat - 1) ** 2, 1e-12))
+        k, shots = self._sample(self._probability(qubit, control, t, "z"),
+                                lambda p_hat, se: self.z * spread(p_hat, se) <= precision)
+        p_hat = k / shots
+        theta = np.arccos(2 * p_hat - 1)
+        half = self.z * spread(p_hat, np.sqrt(p_hat * (1 - p_hat) / shots))
+        KAPPA = alias_candidates(theta, range(-5, 5))
+
+        omega, kappa, gamma1, gamma2 = nominal(qubit).get_param()
+        params = [omega, control.get_u(), kappa, gamma1, gamma2]
+        v0 = System.copy(self.system)
+        v0.evolve(qubit, control, t)  # as in Estimator.estimate_kappa
+        result = EliminationAlgorithmKappa(KAPPA, self.max_shots, t, params, v0.get_coordinates(),
+                                           progress, self.sampler, batch=self.batch,
+                                           truth=ensemble_truth(qubit, control, "z", v0))
+        return self._eliminated(result, KAPPA, half, shots)
+
+    def estimate_omega(self, qubit: Qubit, precision: float, progress=None) -> SequentialResult:
+        control = Control(u=0)
+        omega, kappa, gamma1, gamma2 = nominal(qubit).get_param()
+        params = [omega, control.get_u(), kappa, gamma1, gamma2]
+        t = 1.0
+        gamma = 0.5 * gamma1 + 2 * gamma2
+
+        # theta = arccos((1 - 2 s1) e^(gamma t)); omega candidates are (+-theta + k pi) / t
+        spread = lambda s, se: (2 * np.exp(gamma * t) * se
+                                / np.sqrt(max(1 - ((1 - 2 * s) * np.exp(gamma * t)) ** 2, 1e-12)) / t)
+        k, shots = self._sample(self._probability(qubit, control, t, "x_rot"),
+                                lambda s, se: self.z * spread(s, se) <= precision)
+        s1 = k / shots
+        half = self.z * spread(s1, np.sqrt(s1 * (1 - s1) / shots))
+        OMEGA = omega_candidates(s1, t, gamma1, gamma2)
+
+        result = EliminationAlgorithmOmega2(OMEGA, self.max_shots, t, params, self.system.get_coordinates(),
+                                            progress, self.sampler, batch=self.batch,
+                                            truth=ensemble_truth(qubit, control, "x_rot", self.system))
+        return self._eliminated(result, OMEGA, half, shots)
+
+    def _eliminated(self, result, candidates, half, shots):
+        # The fixed-n protocol spends n shots on the first measurement and on every round
+        baseline = self.baseline_n * (1 + result.rounds)
+        value = result.value
+        if value is None:
+            return SequentialResult(None, (np.nan, np.nan), shots + result.shots, baseline, result)
+        others = np.abs(candidates - value)
+        gap = float(others[others > 0].min()) if np.any(others > 0) else np.inf
+        return SequentialResult(value, (value - half, value + half), shots + result.shots, baseline, result, gap)
@@ -0,0 +1,112 @@
+import numpy as np
+
+import instrument
+
+# Sequential Monte Carlo (particle filter) estimation of one parameter.
+#
+# The posterior over the parameter is a weighted particle cloud. Each step
+# picks the measurement time with the largest expected information gain,
+# measures the true system there, and reweights every particle with the
+# binomial likelihood of the observed counts under its closed-form
+# probability. When the effective sample size drops below half the cloud it
+# is resampled and jittered (Liu and West, 2001).
+
+
+class Posterior:
+    # CONSTRUCTOR
+    def __init__(self, particles, weights, shots, steps, level=0.95):
+        self.particles = particles
+        self.weights = weights
+        self.shots = shots    # shots spent on the true system
+        self.steps = steps
+        self.mean = float(np.sum(weights * particles))
+        self.interval = quantiles(particles, weights, [(1 - level) / 2, (1 + level) / 2])
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        return (f"Posterior(mean={self.mean:.5f}, interval=({self.interval[0]:.5f}, "
+                f"{self.interval[1]:.5f}), shots={self.shots}, steps={self.steps})")
+
+
+def quantiles(particles, weights, levels) -> tuple:
+    order = np.argsort(particles)
+    cdf = np.cumsum(weights[order])
+    index = np.minimum(np.searchsorted(cdf, levels), len(particles) - 1)
+    return tuple(float(x) for x in particles[order][index])
+
+
+def entropy(p):
+    """Binary entropy in nats, elementwise."""
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return -(p * np.log(p) + (1 - p) * np.log(1 - p))
+
+
+class ParticleFilter:
+    # CONSTRUCTOR
+    def __init__(self, low: float, high: float, n_particles: int = 2000, rng=None, a: float = 0.98):
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.low, self.high = low, high
+        self.particles = self.rng.uniform(low, high, n_particles)
+        self.weights = np.full(n_particles, 1 / n_particles)
+        self.a = a  # Liu-West shrinkage; jitter variance is (1 - a^2) times the cloud's
+
+    def ess(self) -> float:
+        return 1 / np.sum(self.weights ** 2)
+
+    def update(self, p, successes: int, shots: int):
+        """Reweight with the binomial likelihood of `successes` in `shots` given each particle's p."""
+        p = np.clip(p, 1e-12, 1 - 1e-12)
+        log_w = np.log(self.weights) + successes * np.log(p) + (shots - successes) * np.log(1 - p)
+        w = np.exp(log_w - log_w.max())
+        self.weights = w / w.sum()
+        if self.ess() < len(self.particles) / 2:
+            self.resample()
+
+    def resample(self):
+        # Systematic resampling, then Liu-West kernel moves
+        n = len(self.particles)
+        positions = (self.rng.random() + np.arange(n)) / n
+        index = np.minimum(np.searchsorted(np.cumsum(self.weights), positions), n - 1)
+        x = self.particles[index]
+        mean, sd = x.mean(), x.std()
+        x = self.a * x + (1 - self.a) * mean + np.sqrt(1 - self.a ** 2) * sd * self.rng.standard_normal(n)
+        self.particles = np.clip(x, self.low, self.high)
+        self.weights = np.full(n, 1 / n)
+
+    def expected_information(self, p, weights=None) -> np.ndarray:
+        """Single-shot mutual information between the outcome and the parameter.
+
+        `p` holds the probability of outcome 1 for each particle (rows) at
+        each candidate setting (columns); `weights` defaults to the cloud's.
+        """
+        weights = self.weights if weights is None else weights
+        return entropy(weights @ p) - weights @ entropy(p)
+
+
+@instrument.timed("smc.estimate")
+def estimate(model, measure, low: float, high: float, times, shots: int, steps: int = 20,
+             n_particles: int = 2000, design_particles: int = 100, rng=None,
+             progress=None, level: float = 0.95) -> Posterior:
+    """Particle-filter estimate of one parameter in [low, high].
+
+    model(values, t) returns the probability of outcome 1 for parameter
+    values (N,) at times (T,) as an (N, T) array; measure(t, shots) returns
+    the number of 1 outcomes observed on the true system. Each of the
+    `steps` steps spends `shots` shots at the time in `times` maximising the
+    expected information, scored on a random subset of `design_particles`
+    particles to keep it cheap. progress(step, interval) is called after
+    each step.
+    """
+    pf = ParticleFilter(low, high, n_particles, rng)
+    times = np.asarray(times, dtype=float)
+    for step in range(1, steps + 1):
+        # A weighted draw from the cloud, scored with equal weights
+        subset = pf.particles[pf.rng.choice(n_particles, size=design_particles, p=pf.weights)]
+        gain = pf.expected_information(model(subset, times), np.full(design_particles, 1 / design_particles))
+        t = times[int(np.argmax(gain))]
+
+        k = measure(t, shots)
+        pf.update(model(pf.particles, np.array([t]))[:, 0], k, shots)
+        if progress is not None:
+            progress(step, np.array(quantiles(pf.particles, pf.weights, [(1 - level) / 2, (1 + level) / 2])))
+    return Posterior(pf.particles, pf.weights, shots * steps, steps, level)
@@ -0,0 +1,161 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import instrument
+
+# Content-addressed store of estimation results.
+#
+# A job is described by a plain dict of its inputs (qubit parameters,
+# protocol, shots, seed, ...). Its key is the sha256 of the canonical JSON of
+# those inputs, and its result lives in <root>/<key[:2]>/<key>.json, so a
+# lookup is a single file open whatever the size of the store. Results are
+# written to a temporary file in the same shard and moved into place with
+# os.replace, which is atomic: concurrent writers (worker processes, several
+# campaigns) never leave a partial file, and a reader sees either nothing or
+# a complete result. A hit refreshes the file's modification time, so prune()
+# drops the least recently used results first.
+
+VERSION = 1  # part of every key; bump when a change alters the results of the same inputs
+
+
+def _canonical(value):
+    # Plain JSON types only, so equal inputs always serialise identically
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.random.SeedSequence):
+        return {"entropy": _canonical(value.entropy), "spawn_key": list(map(int, value.spawn_key))}
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    return value
+
+
+def key(inputs: dict) -> str:
+    """sha256 hex digest of the canonical JSON of `inputs`."""
+    text = json.dumps({"version": VERSION, "inputs": _canonical(inputs)}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def default_path() -> str:
+    """$QUBIT_STORE, or qubit_identification under the user cache directory."""
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.environ.get("QUBIT_STORE") or os.path.join(cache, "qubit_identification")
+
+
+class ResultStore:
+    # CONSTRUCTOR
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        return f"ResultStore({self.path!r}, hits={self.hits}, misses={self.misses})"
+
+    def _file(self, digest: str) -> str:
+        return os.path.join(self.path, digest[:2], digest + ".json")
+
+    def get(self, inputs: dict, default=None):
+        """Stored result for `inputs`, or `default`."""
+        path = self._file(key(inputs))
+        try:
+            with open(path) as f:
+                result = json.load(f)["result"]
+        except FileNotFoundError:
+            self.misses += 1
+            instrument.count("store.misses")
+            return default
+        with contextlib.suppress(OSError):  # read-only stores still serve hits
+            os.utime(path)
+        self.hits += 1
+        instrument.count("store.hits")
+        return result
+
+    def put(self, inputs: dict, result):
+        """Store the JSON-serialisable `result` of `inputs`, replacing any previous one."""
+        digest = key(inputs)
+        shard = os.path.dirname(self._file(digest))
+        os.makedirs(shard, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=shard, prefix=digest[:8], suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"key": digest, "inputs": _canonical(inputs), "result": result}, f)
+            os.replace(tmp, self._file(digest))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp)
+            raise
+        instrument.count("store.writes")
+
+    def __contains__(self, inputs: dict) -> bool:
+        return os.path.exists(self._file(key(inputs)))
+
+    def keys(self):
+        """Keys of every stored result (walks the whole store)."""
+        for shard in sorted(os.listdir(self.path)):
+            directory = os.path.join(self.path, shard)
+            if os.path.isdir(directory):
+                yield from sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
+
+    def __len__(self):
+        return sum(1 for _ in self.keys())
+
+    def prune(self, max_bytes: int = None, max_age: float = None) -> int:
+        """Remove results unused for `max_age` seconds, then the least recently used until at most `max_bytes` remain.
+
+        Returns the number of results removed. Results removed by a
+        concurrent prune are skipped.
+        """
+        entries = []
+        for digest in self.keys():
+            with contextlib.suppress(FileNotFoundError):
+                info = os.stat(self._file(digest))
+                entries.append((info.st_mtime, info.st_size, digest))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        cutoff = None if max_age is None else time.time() - max_age
+        removed = 0
+        for mtime, size, digest in entries:
+            if not ((cutoff is not None and mtime < cutoff) or (max_bytes is not None and total > max_bytes)):
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self._file(digest))
+                removed += 1
+            total -= size
+        instrument.count("store.evictions", removed)
+        return removed
+
+    def clear(self) -> int:
+        """Remove every stored result; returns how many there were."""
+        return self.prune(max_bytes=0)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prune or clear a result store")
+    parser.add_argument("path", nargs="?", default=default_path())
+    parser.add_argument("--max-bytes", type=int, help="drop least recently used results beyond this size")
+    parser.add_argument("--max-age", type=float, metavar="DAYS", help="drop results unused for this many days")
+    parser.add_argument("--clear", action="store_true", help="remove every result")
+    args = parser.parse_args()
+
+    store = ResultStore(args.path)
+    if args.clear:
+        removed = store.clear()
+    else:
+        removed = store.prune(args.max_bytes, None if args.max_age is None else args.max_age * 86400)
+    print(f"removed {removed} results from {args.path}; {len(store)} left")
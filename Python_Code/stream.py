@@ -0,0 +1,125 @@
+import asyncio
+from collections import namedtuple
+
+import numpy as np
+
+from qubit import Qubit
+import instrument
+import joint
+import sampling
+
+# Streaming ingestion of single-shot records.
+#
+# Shots arrive one record at a time, from the lab or from simulate() below.
+# Only the number of shots and of 1 outcomes per distinct setting is kept,
+# so memory is bounded by the number of settings, not of shots, and the
+# joint fit can be refreshed at any point from the counts seen so far.
+
+# One single-shot record: initial Bloch vector, basis, drive u, time t and outcome 0 or 1
+Shot = namedtuple("Shot", ["preparation", "basis", "u", "t", "outcome"])
+
+
+class Counts:
+    """Running (shots, successes) per setting."""
+
+    # CONSTRUCTOR
+    def __init__(self):
+        self.table = {}  # (preparation, basis, u, t) -> [shots, successes]
+        self.shots = 0
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        return f"Counts(settings={len(self.table)}, shots={self.shots})"
+
+    def __len__(self):
+        return len(self.table)
+
+    def add(self, record: Shot):
+        key = (tuple(map(float, record.preparation)), record.basis, float(record.u), float(record.t))
+        entry = self.table.get(key)
+        if entry is None:
+            entry = self.table[key] = [0, 0]
+        entry[0] += 1
+        entry[1] += int(record.outcome)
+        self.shots += 1
+
+    def arrays(self) -> tuple:
+        """(joint.Settings, shots, successes) for the settings seen so far."""
+        keys = list(self.table)
+        settings = joint.Settings([k[0] for k in keys], [k[1] for k in keys],
+                                  [k[2] for k in keys], [k[3] for k in keys])
+        counts = np.array(list(self.table.values()), dtype=float).reshape(len(keys), 2)
+        return settings, counts[:, 0], counts[:, 1]
+
+
+class OnlineEstimator:
+    """Joint estimate of (omega, kappa, gamma1, gamma2) refreshed as shot records stream in.
+
+    The fit is refreshed every `refresh` shots, once at least `min_shots`
+    have arrived. `updates` consumes an iterator and `aupdates` an async
+    iterator; both yield each new joint.JointFit and never hold more than
+    the counts.
+    """
+
+    # CONSTRUCTOR
+    def __init__(self, refresh: int = 10000, min_shots: int = 1000, **options):
+        self.counts = Counts()
+        self.refresh_every = refresh
+        self.min_shots = min_shots
+        self.options = options  # passed on to joint.fit
+        self.last_fit = None
+        self._next = max(refresh, min_shots)
+
+    def add(self, record: Shot) -> bool:
+        """Count one record; True when a refresh is due."""
+        self.counts.add(record)
+        return self.counts.shots >= self._next
+
+    def refresh(self) -> joint.JointFit:
+        self._next = self.counts.shots + self.refresh_every
+        self.last_fit = joint.fit(*self.counts.arrays(), **self.options)
+        return self.last_fit
+
+    def updates(self, records):
+        for record in records:
+            if self.add(record):
+                yield self.refresh()
+
+    async def aupdates(self, records):
+        # The fit runs in a worker thread so the event loop keeps receiving records
+        async for record in records:
+            if self.add(record):
+                yield await asyncio.to_thread(self.refresh)
+
+
+def simulate(qubit: Qubit, settings: joint.Settings = None, shots: int = 1000, chunk: int = 4096,
+             sampler=None):
+    """Shot records for `shots` shots at every setting, generated about `chunk` at a time.
+
+    Each chunk takes an equal share of shots from every setting that still
+    owes some and shuffles them, so settings are interleaved in the stream.
+    """
+    settings = joint.schedule() if settings is None else settings
+    sampler = sampling.resolve(sampler)
+    p = settings.probabilities(np.column_stack(qubit.get_param())).mean(axis=0)
+    heads = [(tuple(map(float, v0)), basis, float(u), float(t))
+             for v0, basis, u, t in zip(settings.v0, settings.basis, settings.u, settings.t)]
+    remaining = np.full(len(settings), int(shots))
+    share = max(1, chunk // len(settings))
+    while remaining.any():
+        take = np.minimum(remaining, share)
+        remaining -= take
+        index = sampler.rng.permutation(np.repeat(np.arange(len(settings)), take))
+        outcomes = sampler.counts(p[index], 1)
+        instrument.count("shots.measured", len(index))
+        for i, outcome in zip(index.tolist(), outcomes.tolist()):
+            yield Shot(*heads[i], outcome)
+
+
+async def asimulate(qubit: Qubit, settings: joint.Settings = None, shots: int = 1000, chunk: int = 4096,
+                    sampler=None):
+    """Async version of simulate(), yielding control to the event loop after every chunk."""
+    for k, record in enumerate(simulate(qubit, settings, shots, chunk, sampler), 1):
+        yield record
+        if k % chunk == 0:
+            await asyncio.sleep(0)
@@ -1,9 +1,10 @@
 import numpy as np
-from scipy.integrate import solve_ivp
 from utils import sx, sy, sz
-from qubit import Qubit
+from qubit import Qubit, QubitArray
 from control import Control
-import matplotlib.pyplot as plt
+import cache
+import instrument
+import propagator
 
 class System:
     # CONSTRUCTOR
@@ -12,6 +13,7 @@ class System:
         self.y = y
         self.z = z
         self._initial_state = (x, y, z)
+        self.members = None  # (n, 3) Bloch vector of every member after evolving with a QubitArray
 
     # COPY CONSTRUCTOR
     
@@ -19,7 +21,9 @@ class System:
     def copy(cls, other_system):
         if not isinstance(other_system, cls):
             raise TypeError("Can only copy from another System instance.")
-        return cls(other_system.x, other_system.y, other_system.z)
+        system = cls(other_system.x, other_system.y, other_system.z)
+        system.members = None if other_system.members is None else other_system.members.copy()
+        return system
 
     # GETTERS
     def get_x(self):
@@ -35,41 +39,80 @@ class System:
         return [self.x, self.y, self.z]
 
     # EVOLUTION METHOD
+    @instrument.timed("system.evolve")
     def evolve(self, q: Qubit, c: Control, t: float):
+        if isinstance(q, QubitArray):
+            # Every member keeps its own state; the coordinates are the ensemble average
+            self.members = self._evolve_members(q, c, np.array([t]))[:, 0]
+            self.x, self.y, self.z = self.members.mean(axis=0).tolist()
+            return
+        self._check_single()
+
         omega, kappa, gamma1, gamma2 = q.get_param()
         u = c.get_u()
         v0 = self.get_coordinates()
 
-        # Define the matrix J
-        J = np.array([
-            [-gamma1 / 2 - 2 * gamma2, -omega,           0],
-            [ omega,                  -gamma1 / 2 - 2 * gamma2, -u * kappa],
-            [    0,                    u * kappa,       -gamma1]
-        ])
-
-        # Define vector b
-        b = np.array([0, 0, gamma1])
-
-        # Solve the differential equation dv/dt = Jv + b
-        sol = solve_ivp(lambda tau, v: J @ v + b, [0, t], v0, t_eval=[t])
-        v_t = sol.y[:,-1]
+        # Exact solution of dv/dt = Jv + b, through the propagator cache
+        if c.segments is None:
+            v_t = cache.evolve([omega, u, kappa, gamma1, gamma2], v0, t)
+        else:
+            v_t = propagator.apply(cache.cached_sequence(q.get_param(), c.until(t)), v0)
 
         # Update internal state
         self.x, self.y, self.z = v_t.tolist()
         
+    # BATCHED EVOLUTION
+    @staticmethod
+    def evolve_batch(times, params, v0):
+        """Final Bloch vectors for arrays of times, parameter tuples
+        (omega, u, kappa, gamma1, gamma2) and initial vectors.
+
+        `times` (...), `params` (..., 5) and `v0` (..., 3) are broadcast
+        together and the result has shape (..., 3).
+        """
+        return propagator.evolve(params, v0, times)
+
+    def trajectory(self, q: Qubit, c: Control, times):
+        """Bloch vectors at each of `times` from the current state, leaving it unchanged.
+
+        For a QubitArray the vectors are averaged over the ensemble.
+        """
+        if not isinstance(q, QubitArray):
+            self._check_single()
+            return self._evolve_members(q, c, times)[0]
+        return self._evolve_members(q, c, times).mean(axis=0)
+
+    def _check_single(self):
+        if self.members is not None:
+            raise ValueError("the system holds the states of an ensemble; initialize() it before "
+                             "evolving with a single Qubit")
+
+    def _evolve_members(self, q, c: Control, times) -> np.ndarray:
+        # Bloch vectors (members, T, 3), each member from its own state when it has one
+        times = np.asarray(times, dtype=float)
+        theta = np.column_stack(q.get_param())  # (members, 4)
+        if self.members is None:
+            start = np.array(self.get_coordinates(), dtype=float)
+        elif len(self.members) == len(theta):
+            start = self.members[:, None, :]
+        else:
+            raise ValueError(f"the system holds the states of {len(self.members)} members, "
+                             f"not {len(theta)}")
+        if c.segments is not None:
+            amplitudes, durations = zip(*c.segments)
+            P = propagator.sequence(theta[:, None, :], amplitudes, durations, times)
+            return propagator.apply(P, start)
+        params = np.insert(theta, 1, c.get_u(), axis=1)
+        return System.evolve_batch(times, params[:, None, :], start)
+
     def initialize(self):
         """Reset the system's coordinates to their initial values."""
         self.x, self.y, self.z = self._initial_state
+        self.members = None
         
     def draw(self,q,c,t) :
-        X = []
+        import matplotlib.pyplot as plt  # plotting only, kept off the import path
+
         times = np.linspace(0,t,100)
-        for a in times : 
-            self.evolve(q,c,float(a))
-            X.append(self.x)
-            self.initialize()
-        X = np.array(X)    
+        X = self.trajectory(q,c,times)[:, 0]
         plt.plot(times,X)
-         
-        
-            
\ No newline at end of file
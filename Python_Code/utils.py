@@ -1,6 +1,11 @@
+from collections import namedtuple
+
 import numpy as np
-from scipy.integrate import solve_ivp
-from scipy.linalg import expm
+import cache
+import instrument
+import propagator
+import sampling
+from measurement import excited_probability, rotated_excited_probability
 
 sx = np.array([[0, 1], [1, 0]])
 sy = np.array([[0, -1j], [1j, 0]])
@@ -17,139 +22,195 @@ BlochStates = {
     "|-i⟩": np.array([0, -1, 0]),
 }
 
-def EliminationAlgorithmKappa(kappa_list: list, n: int, t1: float, parameters: list, v0: np.array) -> float:
-    tolerance = 0.15
-
-    while len(kappa_list) > 1:
+class EliminationResult:
+    # CONSTRUCTOR
+    def __init__(self, value, candidates, rounds, reason, shots=0):
+        self.value = value            # surviving candidate, or None
+        self.candidates = candidates  # candidates left when the loop stopped
+        self.rounds = rounds
+        self.reason = reason          # "converged", "exhausted", "rejected" or "max_rounds"
+        self.shots = shots            # shots spent measuring the true system
+
+    # PRINT REPRESENTATION
+    def __repr__(self):
+        return (f"EliminationResult(value={self.value}, remaining={len(self.candidates)}, "
+                f"rounds={self.rounds}, reason={self.reason!r})")
+
+
+# One measurement of the true system requested by an elimination round: n shots
+# at time t, or, when `stop` is set, `batch` shots at a time until
+# stop(p_hat, se) holds (n at most). `expected` is the model's probability
+# for the given parameters, which local simulation uses as the truth.
+Measurement = namedtuple("Measurement", ["t", "shots", "stop", "batch", "expected"])
+
+
+def elimination(candidates, index: int, n: int, t1: float, parameters: list, v0: np.array,
+                probability=excited_probability, tolerance: float = 0.15,
+                reference_tolerance: float = None, max_rounds: int = 50,
+                progress=None, sampler=None, batch: int = None, z: float = 1.96):
+    """Generator core of EliminationAlgorithm.
+
+    Yields a Measurement of the true system each round and expects the
+    (successes, shots) observed to be sent back; returns the
+    EliminationResult. The caller decides where the measurement runs: in
+    process (EliminationAlgorithm) or on a remote backend (backend.py).
+    """
+    sampler = sampling.resolve(sampler)
+    candidates = np.asarray(candidates, dtype=float)
+    params = np.asarray(parameters, dtype=float)
+    rounds = 0
+    shots = 0
+
+    while len(candidates) > 1 and rounds < max_rounds:
         # Random new measurement time
-        t_new = np.random.uniform(t1 / 2, t1)
-
-        # Evaluate simulation results for all kappa candidates
-        results = []
-        for kappa_potential in kappa_list:
-            new_params = parameters.copy()
-            new_params[2] = kappa_potential
-            res = QubitSimulation(new_params, v0, t_new, n)
-            results.append(res)
-
-        # True result using actual kappa (assumed known from original parameters)
-        true_result = QubitSimulation(parameters, v0, t_new, n)
+        t_new = sampler.uniform(t1 / 2, t1)
+
+        # One row per candidate, plus the given parameters in the last row
+        rows = np.tile(params, (len(candidates) + 1, 1))
+        rows[:-1, index] = candidates
+        p = probability(propagator.evolve(rows, v0, t_new))
+        if batch is None:
+            results = sampler.frequency(p[:-1], n)
+            successes, used = yield Measurement(t_new, n, None, None, p[-1])
+        else:
+            half_width = tolerance / 2
+            results = p[:-1]
+            successes, used = yield Measurement(t_new, n, lambda p_hat, se: z * se <= half_width, batch, p[-1])
+        shots += used
 
         # Filter candidates based on how close they are to the true result
-        final_list = []
-        for candidate_kappa, res_candidate in zip(kappa_list, results):
-            if abs(res_candidate - true_result) <= tolerance:
-                final_list.append(candidate_kappa)
-
-        kappa_list = np.array(final_list)
-        if len(kappa_list) == 0:
-            break
+        before = len(candidates)
+        candidates = candidates[np.abs(results - successes / used) <= tolerance]
+        rounds += 1
+        if instrument.enabled:
+            instrument.count("elimination.rounds")
+            instrument.observe("elimination.dropped", before - len(candidates))
+        if progress is not None:
+            progress(rounds, candidates)
 
         tolerance /= 2  # Reduce tolerance
         t1 = t_new
 
     # Final check
-    if len(kappa_list) == 1 and abs(kappa_list[0] - parameters[2]) <= 0.012:
-        return kappa_list[0]
-    else:
-        return "Null"
-    
+    if len(candidates) == 0:
+        return EliminationResult(None, candidates, rounds, "exhausted", shots)
+    if len(candidates) > 1:
+        return EliminationResult(None, candidates, rounds, "max_rounds", shots)
+    if reference_tolerance is not None and abs(candidates[0] - params[index]) > reference_tolerance:
+        return EliminationResult(None, candidates, rounds, "rejected", shots)
+    return EliminationResult(float(candidates[0]), candidates, rounds, "converged", shots)
+
+
+@instrument.timed("elimination")
+def EliminationAlgorithm(candidates, index: int, n: int, t1: float, parameters: list, v0: np.array,
+                         probability=excited_probability, tolerance: float = 0.15,
+                         reference_tolerance: float = None, max_rounds: int = 50,
+                         progress=None, sampler=None, batch: int = None,
+                         z: float = 1.96, truth=None) -> EliminationResult:
+    """Eliminate candidates for parameters[index] against the true parameters.
+
+    Each round evolves every candidate and the true parameter set in one
+    batched propagator call, draws n shots for each, and keeps the candidates
+    whose frequency is within `tolerance` of the true one. `progress`, if
+    given, is called as progress(round, candidates) after every round.
+
+    With `batch` set, the round is adaptive instead: the true system is
+    measured `batch` shots at a time until the z-sigma interval on its
+    frequency is within tolerance / 2 (n shots at most), and candidates are
+    compared through their exact probabilities.
+
+    `truth`, if given, maps a time to the outcome probability of the true
+    system, which is then measured instead of the model at `parameters`
+    (e.g. a QubitArray ensemble).
+    """
+    sampler = sampling.resolve(sampler)
+    core = elimination(candidates, index, n, t1, parameters, v0, probability, tolerance,
+                       reference_tolerance, max_rounds, progress, sampler, batch, z)
+
+    def measure(request):
+        p = request.expected if truth is None else truth(request.t)
+        if request.stop is None:
+            observed = sampler.counts(p, request.shots), request.shots
+        else:
+            observed = sampler.counts_until(p, request.stop, request.batch, request.shots)
+        instrument.count("shots.measured", observed[1])
+        return observed
+
+    return drive(core, measure)
+
+
+def drive(core, measure):
+    """Run an elimination core to completion, answering each Measurement with measure(request)."""
+    try:
+        request = next(core)
+        while True:
+            request = core.send(measure(request))
+    except StopIteration as done:
+        return done.value
+
+
+def EliminationAlgorithmKappa(kappa_list: list, n: int, t1: float, parameters: list, v0: np.array,
+                              progress=None, sampler=None, batch=None, truth=None) -> EliminationResult:
+    return EliminationAlgorithm(kappa_list, 2, n, t1, parameters, v0, excited_probability,
+                                reference_tolerance=0.012, progress=progress, sampler=sampler,
+                                batch=batch, truth=truth)
     
     
-    
-def QubitSimulation(parameters: list, v0: np.array, t: float, n: int) -> float:
-    omega, u, kappa, gamma1, gamma2 = parameters
-
-    # Define the matrix J
-    J = np.array([
-        [-gamma1 / 2 - 2 * gamma2, -omega,           0],
-        [ omega,                  -gamma1 / 2 - 2 * gamma2, -u * kappa],
-        [    0,                    u * kappa,       -gamma1]
-    ])
-
-    # Define vector b
-    b = np.array([0, 0, gamma1])
-
-    # Solve the differential equation dv/dt = Jv + b
-    sol = solve_ivp(lambda tau, v: J @ v + b, [0, t], v0, t_eval=[t])
-    v_t = sol.y[:, -1]
-    
-    # Construct the density matrix using the Pauli basis
-    rho = 0.5 * (np.eye(2) + v_t[0]*sx + v_t[1]*sy + v_t[2]*sz)
+@instrument.timed("utils.QubitSimulation")
+def QubitSimulation(parameters: list, v0: np.array, t: float, n: int, sampler=None) -> float:
+    # Probability of measuring the excited state, memoized on (parameters, t, v0)
+    p = cache.probability(parameters, v0, t, excited_probability)
 
-    # Projector onto excited state |1><1|
-    O = np.array([[0, 0], [0, 1]])
+    # Simulate n measurements using a binomial distribution
+    return sampling.resolve(sampler).frequency(p, n)
 
-    # Compute the probability of measuring the excited state
-    p = np.real(np.trace(O @ rho))
 
-    # Simulate n measurements using a binomial distribution
-    results = np.random.binomial(n=1, p=p, size=n)
-    return np.sum(results) / n
+
+def EliminationAlgorithmOmega2(omega_list: list, n: int, t1: float, parameters: list, v0: np.array,
+                               progress=None, sampler=None, batch=None, truth=None) -> EliminationResult:
+    return EliminationAlgorithm(omega_list, 0, n, t1, parameters, v0, rotated_excited_probability,
+                                progress=progress, sampler=sampler, batch=batch, truth=truth)
+    
+    
+def alias_candidates(theta: float, k_range, t: float = 1.0) -> np.ndarray:
+    """Positive aliases (+-theta + k pi) / t, k in k_range, of an angle read back through its cosine."""
+    return np.array([val / t for k in k_range for val in [theta + k * np.pi, -theta + k * np.pi] if val > 0])
 
 
+def omega_candidates(s1: float, t: float, gamma1: float, gamma2: float, k_range=range(-30, 30)) -> np.ndarray:
+    """omega aliases from the x_rot frequency s1 at t, given the decay rates.
 
-def EliminationAlgorithmOmega2(kappa_list: list, n: int, t1: float, parameters: list, v0: np.array) -> float:
-    tolerance = 0.15
-    while len(kappa_list) > 1:
-        # Random new measurement time
-        t_new = np.random.uniform(t1 / 2, t1)
+    theta = arccos((1 - 2 s1) e^(gamma t)) with gamma = gamma1 / 2 + 2 gamma2;
+    the argument is clipped to [-1, 1], since shot noise can push it beyond.
+    """
+    gamma = 0.5 * gamma1 + 2 * gamma2
+    theta = np.arccos(np.clip((1 - 2 * s1) * np.exp(gamma * t), -1, 1))
+    return alias_candidates(theta, k_range, t)
 
-        # Evaluate simulation results for all kappa candidates
-        results = []
-        for kappa_potential in kappa_list:
-            new_params = parameters.copy()
-            new_params[0] = kappa_potential
-            res = simulate_measurement(new_params, v0, t_new, n)
-            results.append(res)
 
-        # True result using actual kappa (assumed known from original parameters)
-        true_result = simulate_measurement(parameters, v0, t_new, n)
+class LogArgumentError(ValueError):
+    """Shot noise made the log argument of the gamma2 formula non-positive."""
 
-        # Filter candidates based on how close they are to the true result
-        final_list = []
-        for candidate_kappa, res_candidate in zip(kappa_list, results):
-            if abs(res_candidate - true_result) <= tolerance:
-                final_list.append(candidate_kappa)
 
-        kappa_list = np.array(final_list)
-        if len(kappa_list) == 0:
-            break
+def gamma2_from(s1: float, s2: float, t: float, gamma1: float) -> float:
+    """gamma2 from the x_rot frequencies s1 at t and s2 at 2t, given gamma1.
+
+    gamma2 = -ln(2 s2 - 1 + 2 (1 - 2 s1)^2) / (4t) - gamma1 / 4; raises
+    LogArgumentError (a ValueError) when shot noise makes the log argument
+    non-positive.
+    """
+    ln_argument = 2 * s2 - 1 + 2 * (1 - 2 * s1) ** 2
+    if ln_argument <= 0:
+        raise LogArgumentError(f"log argument non-positive: {ln_argument:.5f}")
+    return -np.log(ln_argument) / (4 * t) - 0.25 * gamma1
 
-        tolerance /= 2  # Reduce tolerance
-        t1 = t_new
 
-    # Final check
-    if len(kappa_list) == 1:
-        return kappa_list[0]
-    else:
-        return "Null"
-    
-    
-    
 def solve_time(params, v0, t):
-    omega, u, kappa, gamma1, gamma2 = params
-    J = np.array([
-        [-gamma1 / 2 - 2 * gamma2, -omega, 0],
-        [ omega, -gamma1 / 2 - 2 * gamma2, -u * kappa],
-        [0, u * kappa, -gamma1]
-    ])
-    b = np.array([0, 0, gamma1])
-    sol = solve_ivp(lambda tau, v: J @ v + b, [0, t], v0, t_eval=[t])
-    return sol.y[:, -1]  # Return final state
+    return cache.evolve(params, v0, t)  # Return final state
 
 # --- Helper: simulate one measurement ---
-def simulate_measurement(params, v_init, t,n):
-    v = solve_time(params, v_init, t)
-
-    # Rotate around X by π/4
-    theta = np.pi / 4
-    UX = expm(1j * theta * sx)
-    rho = 0.5 * (np.eye(2) + v[0] * sx + v[1] * sy + v[2] * sz)
-    rho_rot = UX.conj().T @ rho @ UX
-
-    # Measure projector onto |1⟩
-    O = np.array([[0, 0], [0, 1]])
-    p = np.real(np.trace(O @ rho_rot))
-    results = np.random.binomial(n=1, p=p, size=n)
-    return np.sum(results) / n  # empirical mean
+@instrument.timed("utils.simulate_measurement")
+def simulate_measurement(params, v_init, t,n, sampler=None):
+    # Probability of |1⟩ after rotating around X by π/4, memoized
+    p = cache.probability(params, v_init, t, rotated_excited_probability)
+    return sampling.resolve(sampler).frequency(p, n)  # empirical mean